@@ -5,7 +5,8 @@ from typing import Iterable
 
 import streamlit as st
 
-from .ask import ask_question, load_resources
+from common.metrics import record_error, start_exporter
+from common.warmup import start_warm_up
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
@@ -13,6 +14,9 @@ DATA_DIR = BASE_DIR / "data"
 
 @st.cache_resource
 def _cached_resources():
+    # The vector store and the OpenAI SDK are only loaded once a question is asked
+    from .ask import load_resources
+
     return load_resources()
 
 
@@ -43,6 +47,8 @@ def _image_gallery():
 def run_app(embed: bool = False):
     if not embed:
         st.set_page_config(page_title="Gurbani OCR RAG", layout="wide")
+    start_exporter()
+    start_warm_up("gurbani")
     st.title("Gurbani OCR RAG Chatbot")
     st.write(
         "Ask grounded questions in English or Punjabi and receive evidence-backed answers "
@@ -50,12 +56,6 @@ def run_app(embed: bool = False):
     )
     _image_gallery()
 
-    try:
-        client, index, chunks = _cached_resources()
-    except SystemExit as err:
-        st.error(str(err))
-        return
-
     st.markdown("**Ask your question:**")
     question = st.text_area(
         "",
@@ -79,8 +79,15 @@ def run_app(embed: bool = False):
             else:
                 with st.spinner("Retrieving context…"):
                     try:
-                        answer, retrieved = ask_question(question, client, index, chunks)
+                        from .ask import ask_question
+
+                        client, store = _cached_resources()
+                        answer, retrieved = ask_question(question, client, store)
+                    except SystemExit as err:
+                        st.error(str(err))
+                        answer, retrieved = "", []
                     except Exception as exc:  # pragma: no cover
+                        record_error("gurbani", exc)
                         st.error(f"Unable to run assistant: {exc}")
                         answer, retrieved = "", []
                 st.session_state[state_answer_key] = answer
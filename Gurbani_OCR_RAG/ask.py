@@ -1,53 +1,75 @@
+from __future__ import annotations
+
 import argparse
-import json
 import os
 import subprocess
 import sys
 from pathlib import Path
-from typing import List, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
 from dotenv import load_dotenv
-from flask import Flask, render_template_string, request
-from openai import OpenAI
-import faiss
-import numpy as np
+
+from common.gating import is_confident, load_threshold
+from common.llm_gateway import get_gateway
+from common.metrics import CONTENT_TYPE, record_gate, render as render_metrics
+from common.prompts import build_messages, context_blocks
+from common.telemetry import event, span, traced
+
+# numpy, openai, flask and the vector store are imported where they are used so
+# that importing this module (e.g. from the Streamlit page) stays cheap.
+if TYPE_CHECKING:
+    import numpy as np
+    from flask import Flask
+    from openai import OpenAI
+
+    from common.corpus_registry import CorpusRegistry
+    from common.vector_store import VectorStore
 
 load_dotenv()
 
 EMBEDDING_MODEL = "text-embedding-3-large"
 CHAT_MODEL = "gpt-4.1-mini"
 TOP_K = 5
+# Candidates fetched before MMR re-ranking keeps TOP_K diverse chunks
+FETCH_K = 20
+
+REFUSAL = "The information is not present in the provided text."
 
 SYSTEM_PROMPT = (
     "You are a strict Punjabi/English RAG assistant. "
-    "Answer only from the provided context. "
-    'If the answer is not available, say "The information is not present in the provided text." '
-    "Cite chunk IDs when referencing the source."
+    "Answer the user question strictly from the provided context. "
+    f'If the answer is not available, say "{REFUSAL}" '
+    "Reference the chunk IDs when citing facts."
 )
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
-INDEX_PATH = DATA_DIR / "index.faiss"
-CHUNKS_PATH = DATA_DIR / "chunks.json"
-DATA_DIR.mkdir(exist_ok=True)
+STORE_DIR = DATA_DIR / "store"
+CORPORA_ROOT = Path(os.getenv("GURBANI_CORPORA_ROOT", DATA_DIR / "corpora"))
+# Name under which the built-in store is served by /api/ask
+DEFAULT_CORPUS = "gurbani"
 
-app = Flask(__name__)
 
+def load_store(path: Path) -> VectorStore:
+    from common.vector_store import MANIFEST, VectorStore
 
-def load_chunks(path: Path) -> List[dict]:
-    if not path.exists():
+    if not (path / MANIFEST).exists():
         raise SystemExit(f"{path} not found, please run build_index.py first.")
-    return json.loads(path.read_text(encoding="utf-8"))
+    return VectorStore.load(path)
 
 
-def load_index(path: Path) -> faiss.Index:
-    if not path.exists():
-        raise SystemExit(f"{path} not found, please run build_index.py first.")
-    return faiss.read_index(str(path))
+def warm_index_backend() -> None:
+    """Imports faiss ahead of the first question, only if the built store uses an hnsw/ivf index."""
+    from common.vector_store import stored_index_type
+
+    if stored_index_type(STORE_DIR) in ("hnsw", "ivf"):
+        import faiss  # noqa: F401
 
 
 def ensure_index_assets() -> None:
-    if INDEX_PATH.exists() and CHUNKS_PATH.exists():
+    from common.vector_store import MANIFEST
+
+    if (STORE_DIR / MANIFEST).exists():
         return
     print("Index or chunk list missing; running build_index module before start.")
     subprocess.run(
@@ -56,68 +78,71 @@ def ensure_index_assets() -> None:
     )
 
 
-def embed_query(client: OpenAI, question: str) -> np.ndarray:
-    resp = client.embeddings.create(model=EMBEDDING_MODEL, input=question)
-    vector = np.array(resp.data[0].embedding, dtype='float32').reshape(1, -1)
-    faiss.normalize_L2(vector)
-    return vector
+def embed_query(client: OpenAI, question: str, store: VectorStore) -> np.ndarray:
+    """Embeds with the provider the store was built with; raises EmbeddingMismatchError if that is not configured."""
+    from common.embeddings import provider_for_store
+
+    provider = provider_for_store(store, client=client, lab="gurbani", default_model=EMBEDDING_MODEL)
+    return provider.embed_query(question).reshape(1, -1)
 
 
 def retrieve_context(
     client: OpenAI,
-    index: faiss.Index,
-    chunks: List[dict],
+    store: VectorStore,
     question: str,
 ) -> List[dict]:
-    vector = embed_query(client, question)
-    _, indices = index.search(vector, TOP_K)
-    retrieved = []
-    for idx in indices[0]:
-        if 0 <= idx < len(chunks):
-            retrieved.append(chunks[idx])
-    return retrieved
+    """Top chunks for the question (MMR re-ranked), each with its similarity "score"."""
+    vector = embed_query(client, question, store)
+    with span('vector_search', 'search', lab='gurbani'):
+        scores, ids = store.search_mmr(vector, TOP_K, fetch_k=FETCH_K)
+    chunks = store.rows(ids[0])
+    for chunk, score in zip(chunks, scores[0]):
+        chunk['score'] = float(score)
+    return chunks
 
 
 def format_context(chunks: List[dict]) -> str:
-    pieces = []
-    for chunk in chunks:
-        chunk_id = chunk.get('id', 'unknown')
-        samples = chunk['text'].strip()
-        pieces.append(f'[{chunk_id}] {samples}')
-    return '\n\n'.join(pieces)
+    # Ordered by chunk ID, not score, so the same chunks give the same prompt prefix
+    return context_blocks((chunk['id'], chunk['text']) for chunk in chunks)
 
 
-def ask_question(question: str, client: OpenAI, index: faiss.Index, chunks: List[dict]) -> Tuple[str, List[dict]]:
+@traced('ask_question', 'request', lab='gurbani')
+def ask_question(
+    question: str,
+    client: OpenAI,
+    store: VectorStore,
+    bypass_cache: bool = False,
+    corpus: Optional[str] = None,
+) -> Tuple[str, List[dict]]:
     question = question.strip()
     if not question:
         return 'Please ask a question.', []
 
-    retrieved = retrieve_context(client, index, chunks, question)
+    retrieved = retrieve_context(client, store, question)
     if not retrieved:
         return 'No context could be retrieved from the index.', []
 
-    context = format_context(retrieved)
-    messages = [
-        {'role': 'system', 'content': SYSTEM_PROMPT},
-        {
-            'role': 'user',
-            'content': (
-                'Context:\n'
-                f'{context}\n\n'
-                'Answer the user question strictly from the context above. '
-                'Reference the chunk IDs when citing facts. '
-                'If nothing relevant is present, reply with "The information is not present in the provided text."\n\n'
-                f'Question: {question}'
-            ),
-        },
-    ]
-
-    resp = client.chat.completions.create(model=CHAT_MODEL, messages=messages, temperature=0)
+    # Below the corpus's calibrated threshold the model could only refuse; skip the completion
+    threshold = load_threshold(store.path, embedding=store.embedding)
+    if threshold is not None:
+        corpus = corpus or store.path.name
+        confident = is_confident((c['score'] for c in retrieved), threshold)
+        record_gate('gurbani', corpus, confident)
+        if not confident:
+            event('retrieval_gated', lab='gurbani', corpus=corpus, threshold=threshold,
+                  top_score=max(c['score'] for c in retrieved))
+            return REFUSAL, []
+
+    messages = build_messages(SYSTEM_PROMPT, format_context(retrieved), question)
+
+    resp = get_gateway().chat(
+        CHAT_MODEL, messages, temperature=0, client=client, cache="gurbani", bypass_cache=bypass_cache
+    )
     answer = resp.choices[0].message.content.strip()
     return answer, retrieved
 
 
-def ask_loop(client: OpenAI, index: faiss.Index, chunks: List[dict]) -> None:
+def ask_loop(client: OpenAI, store: VectorStore) -> None:
     print('Chatbot ready. Ask a question (or type q to quit).')
     while True:
         question = input('\nQuestion: ').strip()
@@ -125,18 +150,54 @@ def ask_loop(client: OpenAI, index: faiss.Index, chunks: List[dict]) -> None:
             print('Goodbye!')
             break
 
-        answer, _ = ask_question(question, client, index, chunks)
+        answer, _ = ask_question(question, client, store)
         print('\nAnswer:\n', answer)
 
 
-@app.route('/', methods=['GET', 'POST'])
+def metrics():
+    from flask import Response
+
+    return Response(render_metrics(), mimetype=CONTENT_TYPE)
+
+
+def api_ask():
+    """JSON API: /api/ask?corpus=<name>&question=... (or a JSON body with "question")."""
+    from flask import current_app as app, jsonify, request
+
+    from common.exceptions import EmbeddingMismatchError, VectorStoreError
+
+    payload = request.get_json(silent=True) or {}
+    corpus = request.args.get('corpus') or payload.get('corpus') or DEFAULT_CORPUS
+    question = payload.get('question') or request.args.get('question', '')
+    bypass_cache = request.headers.get('X-Bypass-Cache', '').lower() in {'1', 'true'}
+    try:
+        store = app.config['registry'].get(corpus)
+    except VectorStoreError as e:
+        return jsonify({'error': str(e), 'corpora': app.config['registry'].names()}), 404
+    try:
+        answer, retrieved = ask_question(question, app.config['client'], store, bypass_cache=bypass_cache,
+                                         corpus=corpus)
+    except EmbeddingMismatchError as e:
+        return jsonify({'error': str(e), 'corpus': corpus}), 409
+    return jsonify({
+        'corpus': corpus,
+        'answer': answer,
+        'chunks': [{'id': c.get('id'), 'text': c.get('text'), 'score': c.get('score')} for c in retrieved],
+    })
+
+
 def homepage():
+    from flask import current_app as app, render_template_string, request
+
     answer = ''
     question = ''
     chunks_html = ''
     if request.method == 'POST':
         question = request.form.get('question', '').strip()
-        answer, retrieved = ask_question(question, app.config['client'], app.config['index'], app.config['chunks'])
+        bypass_cache = request.headers.get('X-Bypass-Cache', '').lower() in {'1', 'true'}
+        answer, retrieved = ask_question(
+            question, app.config['client'], app.config['store'], bypass_cache=bypass_cache
+        )
         if retrieved:
             chunk_lines = []
             for c in retrieved:
@@ -311,24 +372,50 @@ def homepage():
     )
 
 
-def load_resources() -> Tuple[OpenAI, faiss.Index, List[dict]]:
+def load_resources() -> Tuple[OpenAI, VectorStore]:
     api_key = os.getenv('OPENAI_API_KEY')
     if not api_key:
         raise SystemExit('OPENAI_API_KEY is required in .env')
 
+    from openai import OpenAI
+
+    from common.embeddings import provider_for_store
+    from common.exceptions import EmbeddingMismatchError
+
     ensure_index_assets()
     client = OpenAI(api_key=api_key)
-    chunks = load_chunks(CHUNKS_PATH)
-    index = load_index(INDEX_PATH)
-    return client, index, chunks
+    store = load_store(STORE_DIR)
+    try:
+        provider_for_store(store, client=client, lab='gurbani', default_model=EMBEDDING_MODEL)
+    except EmbeddingMismatchError as e:
+        raise SystemExit(str(e))
+    return client, store
 
 
-def run_server():
-    client, index, chunks = load_resources()
+def create_registry(store: Optional[VectorStore] = None) -> CorpusRegistry:
+    """Registry of every corpus under CORPORA_ROOT plus the built-in store (already loaded if given)."""
+    from common.corpus_registry import CorpusRegistry
+
+    registry = CorpusRegistry(CORPORA_ROOT)
+    registry.register(DEFAULT_CORPUS, STORE_DIR, store)
+    return registry
+
+
+def create_app(client: OpenAI, store: VectorStore) -> Flask:
+    from flask import Flask
+
+    app = Flask(__name__)
     app.config['client'] = client
-    app.config['index'] = index
-    app.config['chunks'] = chunks
-    print('Serving chatbot on http://127.0.0.1:7860')
+    app.config['store'] = store
+    app.config['registry'] = create_registry(store)
+    app.add_url_rule('/metrics', view_func=metrics)
+    app.add_url_rule('/api/ask', view_func=api_ask, methods=['GET', 'POST'])
+    app.add_url_rule('/', view_func=homepage, methods=['GET', 'POST'])
+    return app
+
+
+def run_server():
+    app = create_app(*load_resources())
     port = int(os.getenv('PORT', '7860'))
     print('Serving chatbot on http://0.0.0.0:%s' % port)
     app.run(host='0.0.0.0', port=port)
@@ -340,17 +427,15 @@ def main():
     parser.add_argument('--check', action='store_true', help='Validate resources and exit.')
     args = parser.parse_args()
 
-    client, index, chunks = load_resources()
+    client, store = load_resources()
     if args.check:
-        print('Resources loaded; index contains', len(chunks), 'chunks.')
+        print('Resources loaded; index contains', len(store), 'chunks.')
         return
 
     if args.cli:
-        ask_loop(client, index, chunks)
+        ask_loop(client, store)
     else:
-        app.config['client'] = client
-        app.config['index'] = index
-        app.config['chunks'] = chunks
+        app = create_app(client, store)
         port = int(os.getenv('PORT', '7860'))
         print('Serving chatbot on http://0.0.0.0:%s' % port)
         app.run(host='0.0.0.0', port=port)
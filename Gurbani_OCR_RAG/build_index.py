@@ -1,21 +1,42 @@
+"""Builds the Gurbani vector store (or an extra corpus) from OCR text.
+
+Embedding is crash-safe and resumable: chunks are embedded SEGMENT_SIZE at a
+time and each finished segment is written to <store>/.build/ and recorded in a
+journal. A build that is interrupted (crash, rate-limit abort, Ctrl-C) resumes
+from the last committed segment when re-run on the same text, provider and segment size.
+The finished store is saved as a new generation and published with an atomic
+manifest swap (common.vector_store.publish), so a running ask.py never loads
+a half-written index.
+"""
+import argparse
+import hashlib
 import json
 import os
+import shutil
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
 
-import faiss
-import numpy as np
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from common.embeddings import EmbeddingProvider, OpenAIEmbeddings, get_provider
+from common.exceptions import VectorStoreError
+from common.vector_store import VectorStore, new_generation, publish
 
 load_dotenv()
 
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
-DATA_DIR.mkdir(exist_ok=True)
 SOURCE_CANDIDATES = ["Gurbani.txt", "gurbani.txt"]
-INDEX_PATH = DATA_DIR / "index.faiss"
+STORE_DIR = DATA_DIR / "store"
+# Additional corpora served by ask.py's /api/ask?corpus=<name>, one store per subdirectory
+CORPORA_ROOT = Path(os.getenv("GURBANI_CORPORA_ROOT", DATA_DIR / "corpora"))
 CHUNKS_PATH = DATA_DIR / "chunks.json"
+# OpenAI model used when EMBEDDING_PROVIDER is openai (see common.embeddings)
+EMBEDDING_MODEL = "text-embedding-3-large"
+# Chunks embedded and committed to disk at a time; a resumed build redoes at most one segment
+SEGMENT_SIZE = int(os.getenv("INDEX_SEGMENT_SIZE", "1024"))
+BUILD_DIR = ".build"
+JOURNAL = "journal.jsonl"
 
 
 def load_source_text() -> str:
@@ -49,48 +70,159 @@ def chunk_text(text: str, chunk_size: int = 150, overlap: int = 50) -> List[str]
     return chunks
 
 
-def embed_texts(client: OpenAI, texts: List[str], model: str) -> np.ndarray:
-    embeddings: list[np.ndarray] = []
-    for text in texts:
-        resp = client.embeddings.create(model=model, input=text)
-        embedding = np.array(resp.data[0].embedding, dtype="float32")
-        embeddings.append(embedding)
-    matrix = np.vstack(embeddings)
-    faiss.normalize_L2(matrix)
-    return matrix
+def _write_durably(path: Path, write) -> None:
+    """Writes via a temporary file, fsyncs it and renames it into place."""
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("wb") as fh:
+        write(fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _build_fingerprint(chunks: List[str], embedder: EmbeddingProvider, segment_size: int) -> str:
+    """Identifies a build: the same chunks embedded by the same provider and model, in the same segments."""
+    header = {**embedder.info(), "segment_size": segment_size}
+    digest = hashlib.sha256(json.dumps(header, sort_keys=True).encode("utf-8"))
+    for chunk in chunks:
+        digest.update(chunk.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _committed_segments(build_dir: Path, fingerprint: str, plan: Dict[int, int]) -> Dict[int, Path]:
+    """start -> segment file for every journaled segment of this build.
+
+    A journal from a different build (other text, provider or segment size) is
+    discarded. A torn last line (crash while appending), a missing segment file
+    or an entry whose (start, end) is not in `plan` just means that segment is
+    embedded again.
+    """
+    journal = build_dir / JOURNAL
+    lines = journal.read_text(encoding="utf-8").splitlines() if journal.exists() else []
+    try:
+        header = json.loads(lines[0]) if lines else {}
+    except ValueError:
+        header = {}
+    if header.get("fingerprint") != fingerprint:
+        shutil.rmtree(build_dir, ignore_errors=True)
+        build_dir.mkdir(parents=True)
+        _write_durably(journal, lambda fh: fh.write((json.dumps({"fingerprint": fingerprint}) + "\n").encode()))
+        return {}
+    segments = {}
+    for line in lines[1:]:
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            break
+        if plan.get(entry["start"]) == entry["end"] and (build_dir / entry["file"]).exists():
+            segments[entry["start"]] = build_dir / entry["file"]
+    return segments
 
 
-def build_index() -> None:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise SystemExit("OPENAI_API_KEY is required in .env")
+def _commit_segment(build_dir: Path, start: int, end: int, vectors) -> Path:
+    """Persists one segment, then records it in the journal (the commit point)."""
+    import numpy as np
 
-    raw = load_source_text()
-    chunks = chunk_text(raw)
+    segment = build_dir / f"segment-{start:08d}-{end:08d}.npy"
+    _write_durably(segment, lambda fh: np.save(fh, vectors))
+    with (build_dir / JOURNAL).open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps({"start": start, "end": end, "file": segment.name}) + "\n")
+        fh.flush()
+        os.fsync(fh.fileno())
+    return segment
 
-    if not chunks:
-        raise SystemExit("No text to index; check Gurbani.txt before building.")
 
-    print(f"Preparing {len(chunks)} chunks for indexing.")
+def build_store(raw: str, store_dir: Path, provider: Optional[str] = None, fresh: bool = False) -> List[dict]:
+    """Embeds the chunks of `raw` with the configured (or given) provider and publishes the store.
 
-    client = OpenAI(api_key=api_key)
-    matrix = embed_texts(client, chunks, "text-embedding-3-large")
+    Resumes a previous interrupted build of the same chunks unless `fresh`.
+    """
+    import numpy as np
 
-    dim = matrix.shape[1]
-    index = faiss.IndexFlatIP(dim)
-    index.add(matrix)
-    faiss.write_index(index, INDEX_PATH.as_posix())
+    embedder = get_provider(EMBEDDING_MODEL, lab="gurbani", provider=provider)
+    if embedder.name == OpenAIEmbeddings.name:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise SystemExit("OPENAI_API_KEY is required in .env")
+        from openai import OpenAI
+
+        embedder.client = OpenAI(api_key=api_key)
+
+    chunks = chunk_text(raw)
+
+    if not chunks:
+        raise SystemExit("No text to index; check the source text before building.")
+
+    print(f"Preparing {len(chunks)} chunks for indexing ({embedder.name} embeddings).")
+
+    # Local IDF is a deterministic function of the chunks, so a resumed build refits to the same weights
+    embedder.fit(chunks)
+    build_dir = store_dir / BUILD_DIR
+    if fresh:
+        shutil.rmtree(build_dir, ignore_errors=True)
+    plan = {start: min(start + SEGMENT_SIZE, len(chunks)) for start in range(0, len(chunks), SEGMENT_SIZE)}
+    segments = _committed_segments(build_dir, _build_fingerprint(chunks, embedder, SEGMENT_SIZE), plan)
+    total = len(plan)
+    if segments:
+        print(f"Resuming: {len(segments)}/{total} segments already embedded.")
+    for start, end in plan.items():
+        if start not in segments:
+            segments[start] = _commit_segment(build_dir, start, end, embedder.embed(chunks[start:end]))
+            print(f"Embedded segment {start // SEGMENT_SIZE + 1}/{total} (chunks {start + 1}-{end}).")
+    # Exactly one segment per planned range, in order, so row i is chunk i
+    parts = []
+    for start, end in plan.items():
+        part = np.load(segments[start])
+        if len(part) != end - start:
+            raise VectorStoreError(f"Build segment {segments[start].name} has {len(part)} vectors for chunks "
+                                   f"{start + 1}-{end}; re-run with --fresh.")
+        parts.append(part)
+    matrix = np.concatenate(parts)
 
     chunk_payload = [
         {"id": idx, "text": chunk}
         for idx, chunk in enumerate(chunks, start=1)
     ]
-    CHUNKS_PATH.write_text(json.dumps(chunk_payload, ensure_ascii=False, indent=2), encoding="utf-8")
-    print("Index built with", len(chunks), "chunks.")
+    store = VectorStore(matrix.shape[1])
+    store.add(matrix, {"id": [c["id"] for c in chunk_payload], "text": chunks})
+    store.embedding = {**embedder.info(), "dim": matrix.shape[1]}
+    generation = new_generation()
+    store.save(store_dir / generation)
+    embedder.save(store_dir / generation)
+    publish(store_dir, generation)
+    shutil.rmtree(build_dir, ignore_errors=True)
+    return chunk_payload
+
+
+def build_index(provider: Optional[str] = None, fresh: bool = False) -> None:
+    chunk_payload = build_store(load_source_text(), STORE_DIR, provider, fresh)
+    # The store holds its own copy of the chunks; this file is for other readers (Research Agent)
+    _write_durably(CHUNKS_PATH, lambda fh: fh.write(
+        json.dumps(chunk_payload, ensure_ascii=False, indent=2).encode("utf-8")))
+    print("Index built with", len(chunk_payload), "chunks.")
+
+
+def build_corpus(name: str, source: Path, provider: Optional[str] = None, fresh: bool = False) -> None:
+    """Builds an extra corpus from a UTF-8 text file into CORPORA_ROOT/<name>."""
+    chunk_payload = build_store(source.read_text(encoding="utf-8"), CORPORA_ROOT / name, provider, fresh)
+    print(f"Corpus {name} built with {len(chunk_payload)} chunks.")
 
 
 def main() -> None:
-    build_index()
+    parser = argparse.ArgumentParser(description="Build the Gurbani index, or an extra corpus with --corpus.")
+    parser.add_argument("--corpus", help="Name of an extra corpus to build under CORPORA_ROOT.")
+    parser.add_argument("--source", type=Path, help="Text file for --corpus.")
+    parser.add_argument("--provider", choices=("openai", "local"),
+                        help="Embedding provider (default: EMBEDDING_PROVIDER, else openai).")
+    parser.add_argument("--fresh", action="store_true", help="Discard an interrupted build instead of resuming it.")
+    args = parser.parse_args()
+    if args.corpus:
+        if not args.source:
+            parser.error("--corpus requires --source")
+        build_corpus(args.corpus, args.source, args.provider, args.fresh)
+    else:
+        build_index(args.provider, args.fresh)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,53 @@
+"""Calibrates a corpus's retrieval-confidence threshold from a labelled question set.
+
+    python -m Gurbani_OCR_RAG.calibrate --questions labelled.jsonl [--corpus NAME]
+
+Each line of the question file is {"question": "...", "answerable": true|false}.
+The threshold is written to `gating.json` in the corpus's store directory and
+picked up by `ask.ask_question` (and /api/ask) without a restart.
+"""
+import argparse
+import os
+from pathlib import Path
+
+from common.gating import TARGET_RECALL, calibrate_questions, read_questions, save_calibration
+
+from . import ask
+
+
+def corpus_dir(name: str) -> Path:
+    return ask.STORE_DIR if name == ask.DEFAULT_CORPUS else ask.CORPORA_ROOT / name
+
+
+def calibrate_corpus(name: str, questions_path: Path, target_recall: float = TARGET_RECALL) -> dict:
+    from openai import OpenAI
+
+    path = corpus_dir(name)
+    store = ask.load_store(path)
+    client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    def top_score(record: dict) -> float:
+        scores, _ = store.search(ask.embed_query(client, record["question"], store), k=1)
+        return float(scores[0][0])
+
+    calibration = calibrate_questions(read_questions(questions_path), top_score, target_recall)
+    save_calibration(path, calibration, corpus=name, embedding=store.embedding, questions=str(questions_path))
+    return calibration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate the retrieval-confidence threshold of a corpus.")
+    parser.add_argument("--questions", type=Path, required=True, help="JSONL of labelled questions.")
+    parser.add_argument("--corpus", default=ask.DEFAULT_CORPUS, help="Corpus name (default: the built-in store).")
+    parser.add_argument("--target-recall", type=float, default=TARGET_RECALL,
+                        help="Share of answerable questions that must still reach the model.")
+    args = parser.parse_args()
+    calibration = calibrate_corpus(args.corpus, args.questions, args.target_recall)
+    refused = calibration["unanswerable_refused"]
+    print(f"{args.corpus}: threshold {calibration['threshold']:.4f}, "
+          f"answerable recall {calibration['answerable_recall']:.2%}, "
+          f"unanswerable refused {'n/a' if refused is None else f'{refused:.2%}'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import streamlit as st
 
+from common.warmup import start_warm_up
+
 st.set_page_config(page_title="Parmeet Singh", layout="wide")
 
 col1, col2 = st.columns([0.8, 2.2])
@@ -39,4 +41,7 @@ with col2:
 st.markdown("---")
 st.subheader("Explore My Labs")
 st.link_button("Go to Labs →", "/Labs")
-st.write("Check out the **Labs** section in the sidebar to try my interactive AI projects.")
\ No newline at end of file
+st.write("Check out the **Labs** section in the sidebar to try my interactive AI projects.")
+
+# No-op unless LAB_WARMUP is set; preloads lab dependencies in the background.
+start_warm_up()
@@ -1,8 +1,11 @@
 import streamlit as st
-from .pipeline import analyze_contract
 from common.exceptions import BaseAIError
+from common.metrics import start_exporter
+from common.warmup import start_warm_up
 
 def run_app():
+    start_exporter()
+    start_warm_up("legal")
     st.title("Legal Document Analyzer")
 
     uploaded_file = st.file_uploader("Upload a contract (PDF)", type=["pdf"])
@@ -15,6 +18,9 @@ def run_app():
 
         try:
             with st.spinner("Processing contract..."):
+                # pdfplumber and LangChain load on first use, not on page load
+                from .pipeline import analyze_contract
+
                 result = analyze_contract(uploaded_file, query)
                 if result.startswith("Error:"):
                     st.error(result)
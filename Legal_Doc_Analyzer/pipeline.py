@@ -1,10 +1,16 @@
 from .parser import extract_text_from_pdf
 from .qa_utils import get_contract_answer
+from .store import store_contract
 from common.exceptions import BaseAIError
+from common.metrics import record_error
+from common.telemetry import traced
 
+@traced("analyze_contract", "request", lab="legal")
 def analyze_contract(uploaded_file, question: str) -> str:
     try:
         text = extract_text_from_pdf(uploaded_file)
+        store_contract(text, getattr(uploaded_file, "name", ""))
         return get_contract_answer(text, question)
     except BaseAIError as e:
+        record_error("legal", e)
         return f"Error: {str(e)}"
@@ -1,30 +1,24 @@
-import os
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from common.llm_gateway import get_gateway
 from common.logger import get_logger
+from common.prompts import build_messages
 from common.exceptions import OpenAIError
 
 logger = get_logger(__name__)
 
-_CONTRACT_PROMPT = ChatPromptTemplate.from_template(
+CHAT_MODEL = "gpt-4o-mini"
+
+_INSTRUCTIONS = (
     "You are a contract analysis assistant.\n"
-    "Context: {context}\n\n"
-    "Question: {question}\n"
     "Answer clearly, but if unsure, say 'Not specified in this contract.'"
 )
 
 def get_contract_answer(text: str, question: str) -> str:
     try:
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.2,
-            api_key=os.getenv("OPENAI_API_KEY"),
-        )
-        prompt = _CONTRACT_PROMPT.format(context=text[:4000], question=question)
-        response = llm.invoke(prompt)
-        answer = response.content if hasattr(response, "content") else str(response)
-        logger.info(f"Q: {question[:60]} -> A: {answer[:60]}")
+        # Contract text before the question: repeated questions on one contract share the prompt prefix
+        messages = build_messages(_INSTRUCTIONS, text[:4000], question)
+        answer = get_gateway().complete(CHAT_MODEL, messages, temperature=0.2, cache="legal")
+        logger.info("Q: %.60s -> A: %.60s", question, answer)
         return answer
     except Exception as e:
-        logger.error(f"OpenAI contract QA failed: {e}")
+        logger.error("OpenAI contract QA failed: %s", e)
         raise OpenAIError("LLM failed during contract analysis.")
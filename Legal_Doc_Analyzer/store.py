@@ -0,0 +1,74 @@
+"""Extracted contract text, kept so other labs (e.g. the Research Agent) can search it.
+
+Saving is best-effort: a failed write is logged and never affects the analysis.
+The store keeps at most LEGAL_CONTRACT_STORE_MAX contracts (default 200) and
+drops any not uploaded for LEGAL_CONTRACT_STORE_TTL seconds (default 30 days),
+oldest first.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Iterator
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONTRACT_STORE_DIR = Path(__file__).resolve().parent / ".cache" / "contracts"
+MAX_CONTRACTS = int(os.getenv("LEGAL_CONTRACT_STORE_MAX", "200"))
+TTL_SECONDS = float(os.getenv("LEGAL_CONTRACT_STORE_TTL", str(30 * 24 * 3600)))
+
+
+def store_contract(text: str, name: str = "") -> str:
+    """Persists extracted contract text keyed by its content hash (best-effort)."""
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    path = CONTRACT_STORE_DIR / f"{digest}.json"
+    try:
+        if path.exists():
+            # Re-uploading refreshes the contract's age
+            os.utime(path)
+        else:
+            CONTRACT_STORE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.tmp")
+            tmp.write_text(json.dumps({"name": name, "text": text}, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, path)
+            logger.info("Stored contract %s (%s chars)", name or digest[:12], len(text))
+        _prune()
+    except OSError as e:
+        logger.warning("Could not store contract %s: %s", name or digest[:12], e)
+    return digest
+
+
+def _prune() -> None:
+    """Drops contracts older than TTL_SECONDS, then the oldest beyond MAX_CONTRACTS."""
+    now = time.time()
+    kept = []
+    for path in CONTRACT_STORE_DIR.glob("*.json"):
+        try:
+            mtime = path.stat().st_mtime
+            if now - mtime > TTL_SECONDS:
+                path.unlink()
+            else:
+                kept.append((mtime, path))
+        except FileNotFoundError:
+            continue
+    kept.sort(reverse=True)
+    for _, path in kept[MAX_CONTRACTS:]:
+        path.unlink(missing_ok=True)
+    if len(kept) > MAX_CONTRACTS:
+        logger.info("Contract store pruned %s old contracts", len(kept) - MAX_CONTRACTS)
+
+
+def iter_contracts() -> Iterator[dict]:
+    """Yields every stored contract as {"id", "name", "text"}."""
+    if not CONTRACT_STORE_DIR.exists():
+        return
+    for path in sorted(CONTRACT_STORE_DIR.glob("*.json")):
+        try:
+            record = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            # Pruned since the listing
+            continue
+        yield {"id": path.stem, "name": record.get("name", ""), "text": record.get("text", "")}
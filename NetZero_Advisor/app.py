@@ -1,8 +1,13 @@
 import streamlit as st
-from .graph import build_graph
+from .payload import release_payload, spool_upload
 from common.exceptions import BaseAIError
+from common.metrics import record_error, start_exporter
+from common.telemetry import span
+from common.warmup import start_warm_up
 
 def run_app():
+    start_exporter()
+    start_warm_up("netzero")
     st.title("NetZero Advisor")
     st.write("Upload your sustainability report or energy dataset and generate a NetZero roadmap.")
 
@@ -14,13 +19,17 @@ def run_app():
             st.warning("Please upload a file and enter a goal.")
             return
 
+        payload = None
         try:
-            # Read file
-            file_content = uploaded_file.read().decode("utf-8")
+            # Stream the upload to disk; the graph only carries a reference
+            payload = spool_upload(uploaded_file, name=uploaded_file.name)
 
-            # Build and run graph
-            graph = build_graph()
-            result = graph.invoke({"file_content": file_content, "goal": user_goal})
+            # Run the process-wide compiled graph (LangGraph is imported on first use)
+            from .graph import get_graph
+
+            graph = get_graph()
+            with span("netzero_graph", "request", lab="netzero"):
+                result = graph.invoke({"payload": payload, "goal": user_goal})
 
             if "plan" in result:
                 st.subheader("📋 Actionable Roadmap")
@@ -28,6 +37,11 @@ def run_app():
             else:
                 st.error("Error: LLM failed to generate an actionable plan.")
         except BaseAIError as e:
+            record_error("netzero", e)
             st.error(f"Error: {str(e)}")
         except Exception as e:
+            record_error("netzero", e)
             st.error(f"Unexpected error: {str(e)}")
+        finally:
+            if payload:
+                release_payload(payload)
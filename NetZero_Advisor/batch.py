@@ -0,0 +1,265 @@
+"""Batch NetZero runs over a directory of site reports.
+
+    python -m NetZero_Advisor.batch reports/ --goal "Net zero by 2040" --out netzero_batch/
+
+Each CSV/TXT file in the directory is one site. Parse, calculate and simulate
+are CPU-bound and run in a process pool, one site per task. The specialist LLM
+calls run as asyncio tasks; a semaphore bounds how many are in flight across
+all sites, and a site moves on to its LLM stage as soon as its compute stage
+finishes.
+
+Workers are spawned (not forked), so each re-imports the caller's main module:
+a script that calls `run_batch` must do so under `if __name__ == "__main__":`.
+
+Progress is checkpointed to <out>/sites/<file>.json after each stage. A
+re-run with the same directory, goal and output skips finished sites and
+resumes computed ones at the LLM stage. A site whose file changed since its
+checkpoint, or that failed, is run again. Outputs:
+
+    <out>/sites/<file>.md    per-site roadmap
+    <out>/portfolio.md       consolidated portfolio roadmap
+    <out>/portfolio.json     per-site status, footprints and portfolio pathways
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from pathlib import Path
+from typing import List, Optional
+
+from common.exceptions import BaseAIError
+from common.llm_gateway import get_gateway
+from common.logger import get_logger
+from common.metrics import record_error
+from common.prompts import build_messages
+from common.telemetry import span
+
+from .nodes import (
+    CHAT_MODEL,
+    SPECIALIST_NODES,
+    advisor_agent,
+    calculator_agent,
+    extractor_agent,
+    scenario_agent,
+    writer_agent,
+)
+from .payload import payload_from_path
+from .scenarios import format_pathways, plan_scenarios
+
+logger = get_logger(__name__)
+
+SITE_PATTERNS = ("*.csv", "*.txt")
+WORKERS = int(os.getenv("NETZERO_BATCH_WORKERS", "0")) or os.cpu_count() or 1
+LLM_CONCURRENCY = int(os.getenv("NETZERO_LLM_CONCURRENCY", "8"))
+
+MAIN_GUARD_ERROR = ('Batch workers are spawned and re-import the main module; call run_batch '
+                    'under `if __name__ == "__main__":`.')
+
+PORTFOLIO_INSTRUCTIONS = (
+    "You are a sustainability advisor planning decarbonisation across a portfolio of sites.\n"
+    "Using the per-site footprints and the modelled portfolio pathways, write a prioritised roadmap: "
+    "which sites to act on first and why, which pathway to follow, and the cost/emissions trade-off."
+)
+
+
+def find_sites(directory) -> List[Path]:
+    directory = Path(directory)
+    return sorted({path for pattern in SITE_PATTERNS for path in directory.glob(pattern) if path.is_file()})
+
+
+def _fingerprint(path: Path) -> str:
+    """Cheap change check for resume (size and mtime); the full hash is taken in the worker."""
+    stat = path.stat()
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def compute_site(path: str, goal: str) -> dict:
+    """Process-pool task: extract -> calculate -> simulate for one site file."""
+    state = {"payload": payload_from_path(path), "goal": goal}
+    for node in (extractor_agent, calculator_agent, scenario_agent):
+        state.update(node(state))
+    return {key: state[key] for key in ("payload", "stats", "footprint", "scenarios")}
+
+
+class SiteCheckpoints:
+    """One JSON record per site under <out>/sites, replaced atomically on every write."""
+
+    def __init__(self, out_dir):
+        self.dir = Path(out_dir) / "sites"
+        self.dir.mkdir(parents=True, exist_ok=True)
+
+    def _write(self, name: str, text: str) -> None:
+        fd, tmp = tempfile.mkstemp(dir=self.dir, prefix=".tmp_")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        os.replace(tmp, self.dir / name)
+
+    def load(self, site: str) -> Optional[dict]:
+        try:
+            return json.loads((self.dir / f"{site}.json").read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning("Ignoring unreadable checkpoint for %s", site)
+            return None
+
+    def save(self, site: str, record: dict) -> None:
+        self._write(f"{site}.json", json.dumps(record, indent=2))
+
+    def write_plan(self, site: str, plan: str) -> Path:
+        self._write(f"{site}.md", plan)
+        return self.dir / f"{site}.md"
+
+
+async def _complete(limiter: asyncio.Semaphore, fn, *args):
+    """Runs a blocking LLM call in a thread once the concurrency limiter admits it."""
+    async with limiter:
+        return await asyncio.to_thread(fn, *args)
+
+
+async def _advise(state: dict, limiter: asyncio.Semaphore) -> dict:
+    """Specialists concurrently (bounded by `limiter`), then merge and write as the graph does."""
+    deltas = await asyncio.gather(*(_complete(limiter, node, state) for node in SPECIALIST_NODES.values()))
+    state = dict(state, advice={focus: text for delta in deltas for focus, text in delta["advice"].items()})
+    state.update(advisor_agent(state))
+    state.update(writer_agent(state))
+    return state
+
+
+async def _run_site(path: Path, goal: str, checkpoints: SiteCheckpoints, pool: ProcessPoolExecutor,
+                    limiter: asyncio.Semaphore) -> dict:
+    site = path.name
+    fingerprint = _fingerprint(path)
+    record = checkpoints.load(site)
+    if record and (record.get("fingerprint") != fingerprint or record.get("goal") != goal):
+        logger.info("%s changed since its checkpoint; recomputing", site)
+        record = None
+    if record and record["status"] == "done":
+        logger.info("%s already done; skipping", site)
+        return record
+
+    try:
+        with span("netzero_site", "request", lab="netzero", site=site) as attrs:
+            if not record or "state" not in record:
+                state = await asyncio.get_running_loop().run_in_executor(pool, compute_site, str(path), goal)
+                record = {"site": site, "fingerprint": fingerprint, "goal": goal, "status": "computed",
+                          "state": state}
+                checkpoints.save(site, record)
+            else:
+                attrs["resumed"] = True
+            state = await _advise(dict(record["state"], goal=goal), limiter)
+            record.update(status="done", advice=state["advice"], error=None,
+                          plan_path=str(checkpoints.write_plan(site, state["plan"])))
+            checkpoints.save(site, record)
+    except BrokenProcessPool:
+        # Not this site's fault; run_batch reports it
+        raise
+    except Exception as e:
+        record_error("netzero", e)
+        logger.error("Site %s failed: %s", site, e)
+        record = dict(record or {"site": site, "fingerprint": fingerprint, "goal": goal},
+                      status="failed", error=str(e))
+        checkpoints.save(site, record)
+    return record
+
+
+async def _write_portfolio(records: List[dict], goal: str, out_dir: Path, limiter: asyncio.Semaphore) -> dict:
+    """Aggregates finished sites into portfolio.md / portfolio.json."""
+    done = sorted((r for r in records if r["status"] == "done"), key=lambda r: -r["state"]["footprint"])
+    failed = [r for r in records if r["status"] != "done"]
+    total = sum(r["state"]["footprint"] for r in done)
+    scenarios = plan_scenarios(total, goal)
+
+    rows = ["| Site | Footprint tCO2e/yr | Share | Reduction (best P50) | Roadmap |", "|---|---|---|---|---|"]
+    for r in done:
+        footprint = r["state"]["footprint"]
+        pathways = r["state"]["scenarios"]["pathways"]
+        best = f"{max(p['reduction'] for p in pathways):.0%}" if pathways else "n/a"
+        rows.append(f"| {r['site']} | {footprint:,} | {footprint / total if total else 0:.0%} | {best} "
+                    f"| [{r['site']}.md](sites/{r['site']}.md) |")
+    report = "\n".join(rows) + f"\n\nPortfolio total: {total:,} tCO2e/yr.\n\n{format_pathways(scenarios)}"
+
+    summary = ""
+    if done:
+        messages = build_messages(PORTFOLIO_INSTRUCTIONS, report, goal, context_label="Portfolio",
+                                  question_label="Goal")
+        try:
+            summary = await _complete(limiter, partial(get_gateway().complete, temperature=0, cache="netzero"),
+                                      CHAT_MODEL, messages)
+        except Exception as e:
+            record_error("netzero", e)
+            logger.error("Portfolio summary failed: %s", e)
+
+    sections = [f"# NetZero Portfolio Roadmap for Goal: {goal}"]
+    if summary:
+        sections.append(summary)
+    sections.append(f"## Sites\n\n{report}")
+    if failed:
+        sections.append("## Not completed\n\n" + "\n".join(f"- {r['site']}: {r.get('error') or r['status']}"
+                                                           for r in failed))
+    (out_dir / "portfolio.md").write_text("\n\n".join(sections) + "\n", encoding="utf-8")
+
+    portfolio = {
+        "goal": goal,
+        "total_footprint": total,
+        "scenarios": scenarios,
+        "sites": [{"site": r["site"], "status": r["status"], "footprint": r.get("state", {}).get("footprint"),
+                   "plan": r.get("plan_path"), "error": r.get("error")} for r in records],
+    }
+    (out_dir / "portfolio.json").write_text(json.dumps(portfolio, indent=2), encoding="utf-8")
+    return portfolio
+
+
+async def run_batch(directory, goal: str, out_dir, workers: int = WORKERS,
+                    concurrency: int = LLM_CONCURRENCY) -> dict:
+    """Runs every site in `directory` (resuming from checkpoints) and writes the portfolio roadmap.
+
+    Starts spawned worker processes, so a calling script must guard the call
+    with `if __name__ == "__main__":`.
+    """
+    # multiprocessing's own marker for a spawned child still importing the parent's main module
+    if getattr(multiprocessing.current_process(), "_inheriting", False):
+        raise BaseAIError(MAIN_GUARD_ERROR)
+    sites = find_sites(directory)
+    if not sites:
+        raise BaseAIError(f"No site files ({', '.join(SITE_PATTERNS)}) in {directory}.")
+    out_dir = Path(out_dir)
+    checkpoints = SiteCheckpoints(out_dir)
+    limiter = asyncio.Semaphore(concurrency)
+    # Enough threads for every admitted LLM call; the default executor is sized by CPU count
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+
+    with span("netzero_batch", "request", lab="netzero", sites=len(sites), workers=workers,
+              concurrency=concurrency):
+        # Spawned, not forked: a forked worker inherits the log queue handler but not the
+        # listener thread that drains it, so compute-stage logs would be lost
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(sites)),
+                                     mp_context=multiprocessing.get_context("spawn")) as pool:
+                records = await asyncio.gather(*(_run_site(path, goal, checkpoints, pool, limiter)
+                                                 for path in sites))
+        except BrokenProcessPool as e:
+            raise BaseAIError(f"A batch worker process died ({e}). {MAIN_GUARD_ERROR}") from e
+        return await _write_portfolio(list(records), goal, out_dir, limiter)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the NetZero Advisor over a directory of site files.")
+    parser.add_argument("directory", type=Path, help="Directory of site CSV/TXT files.")
+    parser.add_argument("--goal", required=True, help="Goal applied to every site, e.g. 'Net zero by 2040'.")
+    parser.add_argument("--out", type=Path, default=Path("netzero_batch"), help="Output and checkpoint directory.")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Processes for parse/calculate/simulate.")
+    parser.add_argument("--concurrency", type=int, default=LLM_CONCURRENCY, help="Concurrent LLM calls.")
+    args = parser.parse_args()
+    portfolio = asyncio.run(run_batch(args.directory, args.goal, args.out, args.workers, args.concurrency))
+    done = sum(site["status"] == "done" for site in portfolio["sites"])
+    print(f"{done}/{len(portfolio['sites'])} sites done; portfolio roadmap at {args.out / 'portfolio.md'}")
+
+
+if __name__ == "__main__":
+    main()
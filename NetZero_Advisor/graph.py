@@ -1,20 +1,54 @@
+from functools import lru_cache
+
 from langgraph.graph import StateGraph
-from .nodes import extractor_agent, calculator_agent, advisor_agent, writer_agent
+from common.telemetry import traced
+from .nodes import (
+    SPECIALISTS,
+    SPECIALIST_NODES,
+    extractor_agent,
+    calculator_agent,
+    scenario_agent,
+    advisor_agent,
+    writer_agent,
+)
+from .memo import advice_key, file_key, memoize_node, scenario_key
+from .schemas import NetZeroState
+
+def _add_node(workflow: StateGraph, name: str, node) -> None:
+    workflow.add_node(name, traced(name, "graph_node", lab="netzero")(node))
 
 def build_graph():
-    workflow = StateGraph(dict)
+    workflow = StateGraph(NetZeroState)
 
-    # Define nodes
-    workflow.add_node("extract", extractor_agent)
-    workflow.add_node("calculate", calculator_agent)
-    workflow.add_node("advise", advisor_agent)
-    workflow.add_node("write", writer_agent)
+    # Define nodes. Expensive nodes are memoized on a hash of their inputs:
+    # extract/calculate on the file hash, the scenario sweep on footprint + goal,
+    # the advisors on footprint + goal + the modelled pathways, so
+    # a re-run with the same file resumes at the first node whose inputs changed.
+    # Every node is timed as a "graph_node" span (cache hits included).
+    _add_node(workflow, "extract", memoize_node("extract", file_key)(extractor_agent))
+    _add_node(workflow, "calculate", memoize_node("calculate", file_key)(calculator_agent))
+    _add_node(workflow, "simulate", memoize_node("simulate", scenario_key)(scenario_agent))
+    for focus in SPECIALISTS:
+        node = memoize_node(f"advise_{focus}", advice_key(focus))(SPECIALIST_NODES[focus])
+        _add_node(workflow, f"advise_{focus}", node)
+    _add_node(workflow, "advise", advisor_agent)
+    _add_node(workflow, "write", writer_agent)
 
-    # Edges (sequential pipeline)
+    # Edges: extract -> calculate -> simulate, then the specialists fan out in
+    # parallel and fan back in at "advise" once every branch has finished.
     workflow.set_entry_point("extract")
     workflow.add_edge("extract", "calculate")
-    workflow.add_edge("calculate", "advise")
+    workflow.add_edge("calculate", "simulate")
+    branches = [f"advise_{focus}" for focus in SPECIALISTS]
+    for branch in branches:
+        workflow.add_edge("simulate", branch)
+    workflow.add_edge(branches, "advise")
     workflow.add_edge("advise", "write")
 
     workflow.set_finish_point("write")
     return workflow.compile()
+
+@lru_cache(maxsize=1)
+def get_graph():
+    """Returns the compiled graph, compiling it once per process."""
+    return build_graph()
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Optional
+
+from common.logger import get_logger
+from common.metrics import record_cache
+
+logger = get_logger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent
+CACHE_PATH = Path(os.getenv("NETZERO_CACHE_PATH", BASE_DIR / ".cache" / "node_cache.sqlite3"))
+# Bump when a node's logic or prompt changes so stale outputs are not reused.
+CACHE_VERSION = "2"
+
+
+def content_key(*parts) -> str:
+    """Stable hash of the inputs a node output depends on."""
+    blob = json.dumps([CACHE_VERSION, *parts], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class NodeCheckpointer:
+    """SQLite-backed store of node outputs keyed by (node, content hash)."""
+
+    def __init__(self, path: Path = CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS node_outputs ("
+                " node TEXT NOT NULL, key TEXT NOT NULL, output TEXT NOT NULL,"
+                " created REAL NOT NULL, PRIMARY KEY (node, key))"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, node: str, key: str) -> Optional[dict]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT output FROM node_outputs WHERE node = ? AND key = ?", (node, key)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, node: str, key: str, output: dict) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO node_outputs VALUES (?, ?, ?, ?)",
+                (node, key, json.dumps(output, ensure_ascii=False), time.time()),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM node_outputs")
+
+
+_checkpointer: Optional[NodeCheckpointer] = None
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer() -> NodeCheckpointer:
+    global _checkpointer
+    with _checkpointer_lock:
+        if _checkpointer is None:
+            _checkpointer = NodeCheckpointer()
+        return _checkpointer
+
+
+def memoize_node(name: str, key_fn: Callable[[dict], str]):
+    """Wraps a graph node so identical inputs replay the stored output delta."""
+
+    def decorator(node: Callable[[dict], dict]):
+        @wraps(node)
+        def wrapper(state: dict) -> dict:
+            store = get_checkpointer()
+            key = key_fn(state)
+            cached = store.get(name, key)
+            record_cache("netzero_node", name, hit=cached is not None)
+            if cached is not None:
+                logger.info("Node cache hit: %s key=%.12s", name, key)
+                return cached
+            logger.info("Node cache miss: %s key=%.12s", name, key)
+            output = node(state)
+            store.put(name, key, output)
+            return output
+
+        return wrapper
+
+    return decorator
+
+
+def file_key(state: dict) -> str:
+    return content_key("file", state["payload"]["sha256"])
+
+
+def scenario_key(state: dict) -> str:
+    # The horizon runs from the current year, so a new year re-simulates
+    return content_key("simulate", state.get("footprint", 0), state.get("goal", ""), time.gmtime().tm_year)
+
+
+def advice_key(focus: str) -> Callable[[dict], str]:
+    def key_fn(state: dict) -> str:
+        return content_key("advise", focus, state.get("footprint", 0), state.get("goal", ""),
+                           state.get("scenarios"))
+
+    return key_fn
@@ -1,51 +1,94 @@
-import os
-from langchain_openai import ChatOpenAI
+from common.llm_gateway import get_gateway
 from common.logger import get_logger
+from common.prompts import build_messages
 from common.exceptions import BaseAIError
+from .payload import summarize_payload
+from .scenarios import format_pathways, plan_scenarios
 
 logger = get_logger(__name__)
 
-llm = ChatOpenAI(
-    model="gpt-4o-mini",
-    temperature=0,
-    api_key=os.getenv("OPENAI_API_KEY"),
-)
+CHAT_MODEL = "gpt-4o-mini"
+
+# Specialist advisors run as parallel graph branches; order here is the order
+# their sections appear in the merged roadmap.
+SPECIALISTS = {
+    "efficiency": "energy efficiency (equipment upgrades, HVAC, lighting, process optimisation)",
+    "renewables": "renewable energy (on-site solar, PPAs, green tariffs, target renewable %)",
+    "offsets": "carbon offsets and removals (quality criteria, volumes, residual emissions)",
+}
 
 def extractor_agent(state: dict) -> dict:
-    """Extracts sustainability/energy data from uploaded file."""
-    text = state.get("file_content", "")
-    if not text:
+    """Extracts sustainability/energy data from the spooled upload."""
+    payload = state.get("payload")
+    if not payload or not payload.get("size"):
         raise BaseAIError("No file content provided.")
-    logger.info("Extractor processed input file.")
-    return {"raw_text": text, **state}
+    stats = summarize_payload(payload)
+    logger.info("Extractor processed %s: %s bytes, %s lines", payload['name'], stats['bytes'], stats['lines'])
+    return {"stats": stats}
 
 def calculator_agent(state: dict) -> dict:
     """Estimates carbon footprint (mock calculation)."""
-    raw_text = state.get("raw_text", "")
+    stats = state.get("stats") or {}
     # Mock calc for demo
-    footprint = raw_text.count("energy") * 10
-    logger.info(f"Calculator estimated footprint={footprint}")
-    return {"footprint": footprint, **state}
+    footprint = stats.get("keywords", {}).get("energy", 0) * 10
+    logger.info("Calculator estimated footprint=%s", footprint)
+    return {"footprint": footprint}
 
-def advisor_agent(state: dict) -> dict:
-    """LLM suggests improvements based on extracted data + footprint."""
-    footprint = state.get("footprint", 0)
-    raw_text = state.get("raw_text", "")
-    goal = state.get("goal", "")
+def scenario_agent(state: dict) -> dict:
+    """Simulates decarbonisation pathways for the footprint and keeps the Pareto-optimal ones."""
+    plan = plan_scenarios(state.get("footprint", 0), state.get("goal", ""))
+    logger.info("Simulated %s scenarios to %s; %s pathways kept", plan["scenarios"], plan["target_year"],
+                len(plan["pathways"]))
+    return {"scenarios": plan}
+
+def _make_specialist(focus: str, area: str):
+    instructions = (
+        f"You are a sustainability advisor specialising in {area}.\n"
+        "Suggest 2-3 practical improvements limited to your specialty, "
+        "grounded in the modelled pathways: say which pathway they support and the cost/emissions trade-off."
+    )
+
+    def specialist_agent(state: dict) -> dict:
+        """LLM suggests improvements for one decarbonisation lever."""
+        footprint = state.get("footprint", 0)
+        goal = state.get("goal", "")
 
-    prompt = f"""
-    You are a sustainability advisor. A report was provided with footprint={footprint}.
-    Goal: {goal}.
-    Suggest 3-5 practical improvements (e.g., renewable %, offsetting, efficiency).
-    """
-    try:
-        response = llm.invoke(prompt)
-        suggestions = response.content
-        logger.info("Advisor generated suggestions.")
-        return {"suggestions": suggestions, **state}
-    except Exception as e:
-        logger.error(f"Advisor failed: {e}")
+        report = (f"A report was provided with footprint={footprint} tCO2e/yr.\n\n"
+                  f"{format_pathways(state.get('scenarios'))}")
+        messages = build_messages(instructions, report, goal, context_label="Report", question_label="Goal")
+        try:
+            suggestions = get_gateway().complete(CHAT_MODEL, messages, temperature=0, cache="netzero")
+            logger.info("%s advisor generated suggestions.", focus)
+            # Only the delta is returned: sibling branches run in the same step.
+            return {"advice": {focus: suggestions}}
+        except Exception as e:
+            logger.error("%s advisor failed: %s", focus, e)
+            raise BaseAIError(f"{focus.capitalize()} advisor failed to generate suggestions.")
+
+    specialist_agent.__name__ = f"{focus}_advisor"
+    return specialist_agent
+
+efficiency_advisor = _make_specialist("efficiency", SPECIALISTS["efficiency"])
+renewables_advisor = _make_specialist("renewables", SPECIALISTS["renewables"])
+offsets_advisor = _make_specialist("offsets", SPECIALISTS["offsets"])
+SPECIALIST_NODES = {
+    "efficiency": efficiency_advisor,
+    "renewables": renewables_advisor,
+    "offsets": offsets_advisor,
+}
+
+def advisor_agent(state: dict) -> dict:
+    """Merges the specialist branches into a single set of suggestions."""
+    advice = state.get("advice", {}) or {}
+    sections = [
+        f"### {focus.capitalize()}\n\n{advice[focus]}"
+        for focus in SPECIALISTS
+        if advice.get(focus)
+    ]
+    if not sections:
         raise BaseAIError("Advisor agent failed to generate suggestions.")
+    logger.info("Advisor merged %s specialist sections.", len(sections))
+    return {"suggestions": "\n\n".join(sections)}
 
 def writer_agent(state: dict) -> dict:
     """Writes the final NetZero roadmap."""
@@ -55,5 +98,7 @@ def writer_agent(state: dict) -> dict:
         raise BaseAIError("No suggestions provided by advisor.")
 
     roadmap = f"## NetZero Roadmap for Goal: {goal}\n\n{suggestions}"
+    if (state.get("scenarios") or {}).get("pathways"):
+        roadmap += f"\n\n### Modelled pathways\n\n{format_pathways(state['scenarios'])}"
     logger.info("Writer generated roadmap.")
-    return {"plan": roadmap, **state}
+    return {"plan": roadmap}
@@ -0,0 +1,98 @@
+import hashlib
+import mmap
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+
+from common.logger import get_logger
+from common.exceptions import NetZeroError
+from .schemas import PayloadRef, PayloadStats
+
+logger = get_logger(__name__)
+
+CHUNK_SIZE = 1 << 20  # 1 MiB
+SPOOL_DIR = os.path.join(tempfile.gettempdir(), "netzero_uploads")
+KEYWORDS = ("energy",)
+
+
+def spool_upload(fileobj, name: str = "") -> PayloadRef:
+    """Streams an uploaded file to disk in fixed-size chunks, hashing as it goes."""
+    os.makedirs(SPOOL_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(prefix="upload_", dir=SPOOL_DIR)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+    except Exception as e:
+        os.unlink(path)
+        logger.error("Spooling upload failed: %s", e)
+        raise NetZeroError("Could not read uploaded file.")
+
+    name = name or getattr(fileobj, "name", "") or os.path.basename(path)
+    logger.info("Spooled upload %s: %s bytes", name, size)
+    return {"path": path, "size": size, "sha256": digest.hexdigest(), "name": name}
+
+
+def payload_from_path(path: str) -> PayloadRef:
+    """References a file already on disk (no spooling), hashing it in fixed-size chunks."""
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+    except OSError as e:
+        logger.error("Reading %s failed: %s", path, e)
+        raise NetZeroError(f"Could not read {os.path.basename(path)}.")
+    return {"path": path, "size": size, "sha256": digest.hexdigest(), "name": os.path.basename(path)}
+
+
+def release_payload(ref: PayloadRef) -> None:
+    """Deletes the spooled file behind a payload reference."""
+    try:
+        os.unlink(ref["path"])
+    except FileNotFoundError:
+        pass
+
+
+@contextmanager
+def open_payload(ref: PayloadRef) -> Iterator[mmap.mmap]:
+    """Memory-maps a payload read-only so scans page in lazily from disk."""
+    if not ref.get("size"):
+        raise NetZeroError("No file content provided.")
+    with open(ref["path"], "rb") as fh:
+        mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mm
+        finally:
+            mm.close()
+
+
+def _count(mm: mmap.mmap, needle: bytes) -> int:
+    count = 0
+    pos = mm.find(needle)
+    while pos != -1:
+        count += 1
+        pos = mm.find(needle, pos + len(needle))
+    return count
+
+
+def summarize_payload(ref: PayloadRef, keywords: Iterable[str] = KEYWORDS) -> PayloadStats:
+    """Computes payload statistics without materialising the text."""
+    with open_payload(ref) as mm:
+        lines = _count(mm, b"\n")
+        if mm[-1:] != b"\n":
+            lines += 1
+        counts = {word: _count(mm, word.encode("utf-8")) for word in keywords}
+    return {"bytes": ref["size"], "lines": lines, "keywords": counts}
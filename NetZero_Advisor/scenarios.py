@@ -0,0 +1,158 @@
+"""Monte Carlo simulation of decarbonisation pathways.
+
+A pathway is one setting of the levers (renewable share reached after a ramp,
+annual efficiency gain, share of residual emissions offset). Each pathway is
+run under `draws` samples of the uncertain inputs (demand growth, grid emission
+factor and its decline, offset price), so a sweep is a (pathways, draws, years)
+array computed in one pass of NumPy broadcasting. Per pathway we report cost
+and target-year emission percentiles, and keep the pathways on the Pareto front
+of median discounted cost vs median target-year net emissions.
+
+All emissions are tCO2e per year relative to the calculator's footprint, costs
+are discounted USD; the constants below are deliberately simple defaults.
+"""
+import datetime
+import math
+import re
+from typing import List, Optional
+
+from .schemas import Pathway
+
+SCENARIO_COUNT = 10_000
+DRAWS = 20
+TARGET_YEAR = 2050
+TOP_PATHWAYS = 5
+
+START_RENEWABLE_SHARE = 0.2
+MAX_EFFICIENCY_GAIN = 0.04  # per year
+DEMAND_GROWTH, DEMAND_GROWTH_SD = 0.015, 0.01  # per year
+GRID_DECARBONISATION, GRID_DECARBONISATION_SD = 0.02, 0.01  # per year
+EMISSION_FACTOR_SD = 0.1  # lognormal sigma on today's emission factor
+EFFICIENCY_COST = 30.0  # USD per tCO2e avoided
+RENEWABLE_COST = 45.0  # USD per tCO2e avoided
+OFFSET_PRICE, OFFSET_PRICE_SD, OFFSET_PRICE_GROWTH = 15.0, 0.3, 0.05
+DISCOUNT_RATE = 0.05
+
+_YEAR_RE = re.compile(r"\b(20[3-9]\d)\b")
+
+
+def target_year(goal: str, default: int = TARGET_YEAR) -> int:
+    """Target year mentioned in the goal ("net zero by 2040"), else the default."""
+    match = _YEAR_RE.search(goal or "")
+    return int(match.group(1)) if match else default
+
+
+def pareto_front(cost, emissions):
+    """Indices of pathways not dominated on (cost, emissions), both minimised, sorted by cost."""
+    import numpy as np
+
+    order = np.lexsort((emissions, cost))
+    best_before = np.minimum.accumulate(np.concatenate(([np.inf], emissions[order][:-1])))
+    return order[emissions[order] < best_before]
+
+
+def simulate(baseline: float, years: int = 30, scenarios: int = SCENARIO_COUNT, draws: int = DRAWS,
+             seed: int = 0) -> dict:
+    """Runs `scenarios` (= pathways x draws) trajectories over `years` years.
+
+    Returns per-pathway levers and (10, 50, 90) percentiles of discounted cost,
+    target-year net emissions and reduction versus the baseline, plus the
+    Pareto-optimal pathway indices.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    pathways = max(1, scenarios // draws)
+    t = np.arange(1, years + 1, dtype=np.float64)
+
+    # Levers: one value per pathway, broadcast over (draws, years)
+    share_target = rng.uniform(START_RENEWABLE_SHARE, 1.0, pathways)
+    ramp_years = rng.uniform(3.0, max(4.0, years), pathways)
+    efficiency = rng.uniform(0.0, MAX_EFFICIENCY_GAIN, pathways)
+    offset_share = rng.uniform(0.0, 1.0, pathways)
+
+    # Uncertainty: one sample per (pathway, draw), broadcast over years
+    growth = rng.normal(DEMAND_GROWTH, DEMAND_GROWTH_SD, (pathways, draws, 1))
+    decline = rng.normal(GRID_DECARBONISATION, GRID_DECARBONISATION_SD, (pathways, draws, 1))
+    factor_scale = rng.lognormal(0.0, EMISSION_FACTOR_SD, (pathways, draws, 1))
+    offset_price = rng.lognormal(math.log(OFFSET_PRICE), OFFSET_PRICE_SD, (pathways, draws, 1))
+
+    share = START_RENEWABLE_SHARE + (share_target - START_RENEWABLE_SHARE)[:, None, None] * np.minimum(
+        t / ramp_years[:, None, None], 1.0)
+    # Business as usual: today's fossil emissions growing with demand, shrinking with the grid factor
+    bau = (baseline * factor_scale) * ((1 + growth) * (1 - decline)) ** t
+    after_efficiency = bau * (1 - efficiency)[:, None, None] ** t
+    gross = after_efficiency * (1 - share) / (1 - START_RENEWABLE_SHARE)
+    offsets = gross * offset_share[:, None, None]
+    net = gross - offsets
+
+    yearly_cost = ((bau - after_efficiency) * EFFICIENCY_COST
+                   + (after_efficiency - gross) * RENEWABLE_COST
+                   + offsets * offset_price * (1 + OFFSET_PRICE_GROWTH) ** t)
+    cost = (yearly_cost * (1 + DISCOUNT_RATE) ** -t).sum(axis=-1)
+    final = net[..., -1]
+
+    cost_pct = np.percentile(cost, (10, 50, 90), axis=1)
+    net_pct = np.percentile(final, (10, 50, 90), axis=1)
+    return {
+        "scenarios": pathways * draws,
+        "years": years,
+        "baseline": baseline,
+        "levers": {"renewable_share": share_target, "ramp_years": ramp_years,
+                   "efficiency_gain": efficiency, "offset_share": offset_share},
+        "cost": cost_pct,
+        "net": net_pct,
+        "reduction": 1 - net_pct / baseline if baseline else np.zeros_like(net_pct),
+        "front": pareto_front(cost_pct[1], net_pct[1]),
+    }
+
+
+def top_pathways(result: dict, top: int = TOP_PATHWAYS) -> List[Pathway]:
+    """Up to `top` Pareto-optimal pathways spread from cheapest to lowest-emission."""
+    import numpy as np
+
+    front = result["front"]
+    picks = front[np.unique(np.linspace(0, len(front) - 1, min(top, len(front))).round().astype(int))]
+    levers, cost, net, reduction = result["levers"], result["cost"], result["net"], result["reduction"]
+    return [{
+        "renewable_share": round(float(levers["renewable_share"][i]), 3),
+        "ramp_years": round(float(levers["ramp_years"][i]), 1),
+        "efficiency_gain": round(float(levers["efficiency_gain"][i]), 4),
+        "offset_share": round(float(levers["offset_share"][i]), 3),
+        "cost_usd": [round(float(v)) for v in cost[:, i]],
+        "net_tco2e": [round(float(v), 1) for v in net[:, i]],
+        "reduction": round(float(reduction[1, i]), 3),
+    } for i in picks]
+
+
+def plan_scenarios(footprint: float, goal: str = "", start_year: Optional[int] = None) -> dict:
+    """Simulates to the goal's target year and returns the top pathways (JSON-serialisable)."""
+    start_year = start_year or datetime.date.today().year
+    year = target_year(goal)
+    years = min(60, max(1, year - start_year))
+    if footprint <= 0:
+        return {"target_year": year, "years": years, "scenarios": 0, "pathways": []}
+    result = simulate(float(footprint), years=years)
+    return {"target_year": year, "years": years, "scenarios": result["scenarios"],
+            "pathways": top_pathways(result)}
+
+
+def format_pathways(plan: dict) -> str:
+    """Markdown table of the modelled pathways, for prompts and the roadmap."""
+    if not plan or not plan.get("pathways"):
+        return "No scenario modelling available (no baseline footprint)."
+    lines = [
+        f"Pareto-optimal pathways from {plan['scenarios']:,} simulated scenarios to {plan['target_year']} "
+        "(P10/P50/P90 across uncertainty in demand growth, emission factors and offset prices):",
+        "",
+        "| Renewables | Ramp (yrs) | Efficiency/yr | Offsets | Cost USD (P10/P50/P90) "
+        f"| Net tCO2e in {plan['target_year']} (P10/P50/P90) | Reduction (P50) |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for p in plan["pathways"]:
+        lines.append(
+            f"| {p['renewable_share']:.0%} | {p['ramp_years']:.0f} | {p['efficiency_gain']:.1%} "
+            f"| {p['offset_share']:.0%} | {' / '.join(f'{v:,}' for v in p['cost_usd'])} "
+            f"| {' / '.join(f'{v:,.1f}' for v in p['net_tco2e'])} | {p['reduction']:.0%} |"
+        )
+    return "\n".join(lines)
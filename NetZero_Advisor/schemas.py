@@ -0,0 +1,52 @@
+from typing import Annotated, Dict, List, TypedDict
+
+
+def merge_advice(left: Dict[str, str], right: Dict[str, str]) -> Dict[str, str]:
+    """Reducer that lets parallel specialist branches write into one mapping."""
+    return {**(left or {}), **(right or {})}
+
+
+class PayloadRef(TypedDict):
+    """Reference to an upload spooled to disk; the bytes never enter the state."""
+    path: str
+    size: int
+    sha256: str
+    name: str
+
+
+class PayloadStats(TypedDict):
+    """Summary of a payload computed by scanning its memory map."""
+    bytes: int
+    lines: int
+    keywords: Dict[str, int]
+
+
+class Pathway(TypedDict):
+    """One Pareto-optimal simulated pathway; percentile lists are (P10, P50, P90)."""
+    renewable_share: float
+    ramp_years: float
+    efficiency_gain: float
+    offset_share: float
+    cost_usd: List[float]
+    net_tco2e: List[float]
+    reduction: float
+
+
+class ScenarioPlan(TypedDict):
+    """Top pathways from the Monte Carlo sweep (see scenarios.plan_scenarios)."""
+    target_year: int
+    years: int
+    scenarios: int
+    pathways: List[Pathway]
+
+
+class NetZeroState(TypedDict, total=False):
+    """Graph state. Nodes return only the keys they change (deltas)."""
+    payload: PayloadRef
+    goal: str
+    stats: PayloadStats
+    footprint: int
+    scenarios: ScenarioPlan
+    advice: Annotated[Dict[str, str], merge_advice]
+    suggestions: str
+    plan: str
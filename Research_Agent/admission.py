@@ -0,0 +1,100 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from common.logger import get_logger
+from common.exceptions import ResearchError
+
+logger = get_logger(__name__)
+
+MAX_CONCURRENCY = int(os.getenv("RESEARCH_MAX_CONCURRENCY", "4"))
+MAX_QUEUE = int(os.getenv("RESEARCH_MAX_QUEUE", "16"))
+QUEUE_TIMEOUT = float(os.getenv("RESEARCH_QUEUE_TIMEOUT", "30"))
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class AdmissionController:
+    """Bounded admission queue in front of the research agent.
+
+    At most `max_concurrency` runs are active; up to `max_queue` more wait for
+    at most `queue_timeout` seconds, anything beyond that is rejected. Must be
+    used from a single event loop (the orchestrator's background loop).
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY, max_queue: int = MAX_QUEUE,
+                 queue_timeout: float = QUEUE_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.active = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self.wait_times = deque(maxlen=1000)
+
+    @asynccontextmanager
+    async def admit(self):
+        start = time.perf_counter()
+        if not self._semaphore.locked():
+            # A free slot: taken without queueing, so it never counts against max_queue
+            await self._semaphore.acquire()
+        else:
+            await self._wait_for_slot()
+
+        waited = time.perf_counter() - start
+        self.wait_times.append(waited)
+        self.admitted += 1
+        self.active += 1
+        logger.debug("Research admitted after %.1f ms (active=%s, queued=%s)", waited * 1000, self.active, self.waiting)
+        try:
+            yield
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    async def _wait_for_slot(self) -> None:
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            logger.warning("Research queue full (%s waiting); rejecting request", self.waiting)
+            raise ResearchError("The research agent is busy, please try again shortly.")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            logger.warning("Research request timed out after %ss in queue", self.queue_timeout)
+            raise ResearchError("Timed out waiting for a free research slot.")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.waiting -= 1
+
+    def metrics(self) -> dict:
+        waits = list(self.wait_times)
+        return {
+            "queue_depth": self.waiting,
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+            "wait_p50_ms": round(_percentile(waits, 50) * 1000, 1),
+            "wait_p95_ms": round(_percentile(waits, 95) * 1000, 1),
+        }
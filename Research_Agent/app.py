@@ -1,8 +1,14 @@
+from contextlib import closing
+
 import streamlit as st
-from .orchestrator import run_research
+from .orchestrator import ToolSession, admission_metrics, stream_research
 from common.exceptions import BaseAIError
+from common.metrics import record_error, start_exporter
+from common.warmup import start_warm_up
 
 def run_app():
+    start_exporter()
+    start_warm_up("research")
     st.title("Research Agent")
 
     query = st.text_input("Enter your research question:")
@@ -10,11 +16,22 @@ def run_app():
         if not query.strip():
             st.warning("Please enter a question.")
             return
-        with st.spinner("Researching..."):
-            try:
-                answer = run_research(query)
-                st.success(answer)
-            except BaseAIError as e:
-                st.error(f"Error: {str(e)}")
-            except Exception as e:
-                st.error(f"Unexpected error: {str(e)}")
\ No newline at end of file
+        try:
+            # Tool results are cached for the whole browser session
+            session = st.session_state.setdefault("research_tool_session", ToolSession())
+            # Closing the stream (e.g. the user navigates away and Streamlit
+            # stops this script run) cancels the in-flight research task.
+            with closing(stream_research(query, session=session)) as tokens:
+                st.write_stream(tokens)
+        except BaseAIError as e:
+            record_error("research", e)
+            st.error(f"Error: {str(e)}")
+        except Exception as e:
+            record_error("research", e)
+            st.error(f"Unexpected error: {str(e)}")
+
+    metrics = admission_metrics()
+    st.caption(
+        f"Active runs: {metrics['active']}/{metrics['max_concurrency']} · "
+        f"queued: {metrics['queue_depth']} · wait p95: {metrics['wait_p95_ms']} ms"
+    )
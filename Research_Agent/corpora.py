@@ -0,0 +1,135 @@
+"""Local corpora the Research Agent can search: Gurbani chunks, cached YouTube
+transcripts and ingested contracts. Search is lexical (no network calls)."""
+import json
+import math
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+GURBANI_CHUNKS_PATH = ROOT_DIR / "Gurbani_OCR_RAG" / "data" / "chunks.json"
+SNIPPET_CHARS = 500
+PASSAGE_WORDS = 200
+
+# Split on whitespace and punctuation only; \w would break Gurmukhi words at vowel signs.
+_TOKEN_RE = re.compile(r"[^\s.,;:!?()\[\]{}\"'।॥—\-]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class LexicalIndex:
+    """Small TF-IDF index over a list of {"id", "source", "text"} passages."""
+
+    def __init__(self, passages: List[dict]):
+        self.passages = passages
+        self.term_counts = [Counter(tokenize(p["text"])) for p in passages]
+        df = Counter()
+        for counts in self.term_counts:
+            df.update(counts.keys())
+        n = max(1, len(passages))
+        self.idf = {term: math.log(1 + n / freq) for term, freq in df.items()}
+
+    def search(self, query: str, k: int = 5) -> List[dict]:
+        terms = set(tokenize(query))
+        scored: List[Tuple[float, int]] = []
+        for i, counts in enumerate(self.term_counts):
+            score = sum((1 + math.log(counts[t])) * self.idf[t] for t in terms if t in counts)
+            if score > 0:
+                scored.append((score, i))
+        scored.sort(reverse=True)
+        results = []
+        for score, i in scored[:k]:
+            passage = self.passages[i]
+            results.append({
+                "id": passage["id"],
+                "source": passage["source"],
+                "score": round(score, 4),
+                "text": passage["text"][:SNIPPET_CHARS],
+            })
+        return results
+
+
+def _split_passages(text: str, source: str, prefix: str) -> List[dict]:
+    words = text.split()
+    return [
+        {"id": f"{prefix}:{i // PASSAGE_WORDS}", "source": source, "text": " ".join(words[i:i + PASSAGE_WORDS])}
+        for i in range(0, len(words), PASSAGE_WORDS)
+    ]
+
+
+def _gurbani_files() -> List[Path]:
+    return [GURBANI_CHUNKS_PATH] if GURBANI_CHUNKS_PATH.exists() else []
+
+
+def _load_gurbani() -> List[dict]:
+    if not GURBANI_CHUNKS_PATH.exists():
+        return []
+    chunks = json.loads(GURBANI_CHUNKS_PATH.read_text(encoding="utf-8"))
+    return [{"id": f"gurbani:{c['id']}", "source": "Gurbani OCR", "text": c["text"]} for c in chunks]
+
+
+def _youtube_files() -> List[Path]:
+    from YouTube_RAG.transcript_utils import TRANSCRIPT_CACHE_DIR
+
+    return sorted(TRANSCRIPT_CACHE_DIR.glob("*.txt")) if TRANSCRIPT_CACHE_DIR.exists() else []
+
+
+def _load_youtube() -> List[dict]:
+    passages: List[dict] = []
+    for path in _youtube_files():
+        video_id = path.stem
+        text = path.read_text(encoding="utf-8")
+        passages.extend(_split_passages(text, f"YouTube {video_id}", f"youtube:{video_id}"))
+    return passages
+
+
+def _contract_files() -> List[Path]:
+    from Legal_Doc_Analyzer.store import CONTRACT_STORE_DIR
+
+    return sorted(CONTRACT_STORE_DIR.glob("*.json")) if CONTRACT_STORE_DIR.exists() else []
+
+
+def _load_contracts() -> List[dict]:
+    from Legal_Doc_Analyzer.store import iter_contracts
+
+    passages: List[dict] = []
+    for record in iter_contracts():
+        source = f"Contract {record['name'] or record['id'][:12]}"
+        passages.extend(_split_passages(record["text"], source, f"contract:{record['id'][:12]}"))
+    return passages
+
+
+_CORPORA: Dict[str, Tuple[Callable[[], List[Path]], Callable[[], List[dict]]]] = {
+    "gurbani": (_gurbani_files, _load_gurbani),
+    "youtube": (_youtube_files, _load_youtube),
+    "contracts": (_contract_files, _load_contracts),
+}
+_indexes: Dict[str, Tuple[tuple, LexicalIndex]] = {}
+_lock = threading.Lock()
+
+
+def get_index(corpus: str) -> LexicalIndex:
+    """Returns the corpus index, rebuilding it only when its files change."""
+    list_files, load = _CORPORA[corpus]
+    signature = tuple((str(p), p.stat().st_mtime_ns) for p in list_files())
+    with _lock:
+        cached = _indexes.get(corpus)
+        if cached and cached[0] == signature:
+            return cached[1]
+    index = LexicalIndex(load())
+    with _lock:
+        _indexes[corpus] = (signature, index)
+    logger.info("Indexed corpus %s: %s passages", corpus, len(index.passages))
+    return index
+
+
+def search_corpus(corpus: str, query: str, k: int = 5) -> List[dict]:
+    return get_index(corpus).search(query, k)
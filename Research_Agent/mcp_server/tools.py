@@ -1,9 +1,26 @@
 from fastmcp import FastMCP
 
+from ..corpora import search_corpus
+
 # Define MCP server and custom tools
 mcp = FastMCP("research_agent_mcp")
 
 @mcp.tool()
 def echo_tool(message: str) -> str:
     """Simple test tool to check MCP works"""
-    return f"Echo: {message}"
\ No newline at end of file
+    return f"Echo: {message}"
+
+@mcp.tool()
+def search_gurbani(query: str, k: int = 5) -> list[dict]:
+    """Search the Gurbani OCR chunks (Punjabi/English) for passages matching the query"""
+    return search_corpus("gurbani", query, k)
+
+@mcp.tool()
+def search_youtube_transcripts(query: str, k: int = 5) -> list[dict]:
+    """Search transcripts of YouTube videos previously processed by the YouTube RAG lab"""
+    return search_corpus("youtube", query, k)
+
+@mcp.tool()
+def search_contracts(query: str, k: int = 5) -> list[dict]:
+    """Search contracts previously ingested by the Legal Document Analyzer"""
+    return search_corpus("contracts", query, k)
@@ -1,31 +1,252 @@
-import os
-from openai import OpenAI
+import asyncio
+import json
+import queue
+import threading
+import time
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+from common.llm_gateway import get_gateway
 from common.logger import get_logger
 from common.exceptions import BaseAIError
+from common.metrics import record_cache
+from common.telemetry import span
+from .admission import AdmissionController
+from .corpora import search_corpus
 
 logger = get_logger(__name__)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+MODEL = "gpt-4o-mini"
+MAX_STEPS = 4
+
+SYSTEM_PROMPT = (
+    "You are a helpful research assistant with search tools over local corpora: "
+    "Gurbani OCR text, cached YouTube transcripts and ingested contracts. "
+    "When a question may touch several sources, call all relevant tools in the same turn. "
+    "Cite the passage ids you rely on."
+)
+
+# Tools are the same functions exposed by the MCP server, called in-process.
+TOOLS: Dict[str, Callable[..., list]] = {
+    "search_gurbani": lambda query, k=5: search_corpus("gurbani", query, k),
+    "search_youtube_transcripts": lambda query, k=5: search_corpus("youtube", query, k),
+    "search_contracts": lambda query, k=5: search_corpus("contracts", query, k),
+}
+
+_TOOL_DESCRIPTIONS = {
+    "search_gurbani": "Search the Gurbani OCR chunks (Punjabi/English) for passages matching the query.",
+    "search_youtube_transcripts": "Search transcripts of YouTube videos previously processed by the YouTube RAG lab.",
+    "search_contracts": "Search contracts previously ingested by the Legal Document Analyzer.",
+}
+
+TOOL_SPECS = [
+    {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string"},
+                    "k": {"type": "integer", "minimum": 1, "maximum": 10},
+                },
+                "required": ["query"],
+            },
+        },
+    }
+    for name, description in _TOOL_DESCRIPTIONS.items()
+]
+
+
+class ToolSession:
+    """Per-session tool result cache plus latency stats for each tool."""
+
+    def __init__(self):
+        self.cache: Dict[str, str] = {}
+        self.latencies: Dict[str, List[float]] = {}
+
+    @staticmethod
+    def cache_key(name: str, args: dict) -> str:
+        return f"{name}:{json.dumps(args, sort_keys=True, ensure_ascii=False)}"
+
+    def record(self, name: str, seconds: float) -> None:
+        self.latencies.setdefault(name, []).append(seconds)
+
+
+async def _call_tool(session: ToolSession, name: str, raw_args: str) -> str:
+    try:
+        args = json.loads(raw_args or "{}")
+    except json.JSONDecodeError:
+        return json.dumps({"error": "Arguments were not valid JSON."})
+    if name not in TOOLS:
+        return json.dumps({"error": f"Unknown tool {name}."})
+
+    key = session.cache_key(name, args)
+    record_cache("research_tools", name, hit=key in session.cache)
+    if key in session.cache:
+        logger.debug("Tool cache hit: %s", name)
+        return session.cache[key]
+
+    start = time.perf_counter()
+    try:
+        with span(name, "search", lab="research"):
+            result = json.dumps(await asyncio.to_thread(TOOLS[name], **args), ensure_ascii=False)
+    except Exception as e:
+        logger.error("Tool %s failed: %s", name, e)
+        return json.dumps({"error": f"{name} failed."})
+    elapsed = time.perf_counter() - start
+    session.record(name, elapsed)
+    logger.debug("Tool %s took %.1f ms", name, elapsed * 1000)
+    session.cache[key] = result
+    return result
+
+
+async def run_tool_calls(session: ToolSession, tool_calls: List[dict]) -> List[dict]:
+    """Runs every tool call of one model turn concurrently."""
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(_call_tool(session, call["name"], call["arguments"]) for call in tool_calls)
+    )
+    logger.info("Tool round: %s calls in %.1f ms", len(tool_calls), (time.perf_counter() - start) * 1000)
+    return [
+        {"role": "tool", "tool_call_id": call["id"], "content": result}
+        for call, result in zip(tool_calls, results)
+    ]
+
+
+def _assistant_message(content: str, tool_calls: List[dict]) -> dict:
+    return {
+        "role": "assistant",
+        "content": content or None,
+        "tool_calls": [
+            {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+            for c in tool_calls
+        ],
+    }
 
-def run_research(query: str) -> str:
+
+# ---------------- event loop + admission control ----------------
+# All research runs share one background event loop, so admission control
+# (an asyncio semaphore) sees every Streamlit session in the process.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_admission: Optional[AdmissionController] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="research-loop", daemon=True).start()
+        return _loop
+
+
+def get_admission() -> AdmissionController:
+    global _admission
+    with _loop_lock:
+        if _admission is None:
+            _admission = AdmissionController()
+        return _admission
+
+
+def admission_metrics() -> dict:
+    """Queue depth, active runs and admission wait-time percentiles."""
+    return get_admission().metrics()
+
+
+async def _research_steps(query: str, session: ToolSession) -> AsyncIterator[str]:
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": query},
+    ]
+    for step in range(MAX_STEPS):
+        final_step = step == MAX_STEPS - 1
+        content: List[str] = []
+        calls: Dict[int, dict] = {}
+        async for chunk in get_gateway().astream(
+            MODEL,
+            messages,
+            temperature=0.3,
+            lab="research",
+            tools=TOOL_SPECS,
+            tool_choice="none" if final_step else "auto",
+        ):
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content.append(delta.content)
+                yield delta.content
+            for tc in delta.tool_calls or []:
+                slot = calls.setdefault(tc.index, {"id": "", "name": "", "arguments": ""})
+                slot["id"] = tc.id or slot["id"]
+                if tc.function:
+                    slot["name"] += tc.function.name or ""
+                    slot["arguments"] += tc.function.arguments or ""
+        if not calls:
+            logger.info("Research finished after %s step(s)", step + 1)
+            return
+        tool_calls = [calls[i] for i in sorted(calls)]
+        messages.append(_assistant_message("".join(content), tool_calls))
+        messages.extend(await run_tool_calls(session, tool_calls))
+    raise BaseAIError("Research agent did not converge on an answer.")
+
+
+async def astream_research(query: str, session: Optional[ToolSession] = None) -> AsyncIterator[str]:
     """
-    Basic research flow:
-    - Calls OpenAI model to answer the query
-    - In future, could extend with MCP tools or multi-agent workflows
+    Agentic research flow, streamed:
+    - Waits for an admission slot (bounded queue, see admission.py)
+    - The model may request several tool calls per step; they run concurrently
+    - Tool results are cached for the lifetime of the session
+    - Answer tokens are yielded as they arrive
     """
+    session = session or ToolSession()
+    with span("research", "request", lab="research"):
+        async with get_admission().admit():
+            logger.info("Running research for query: %s", query)
+            async for token in _research_steps(query, session):
+                yield token
+
+
+def stream_research(query: str, session: Optional[ToolSession] = None) -> Iterator[str]:
+    """Sync bridge for Streamlit: yields tokens; closing the generator cancels the run."""
+    tokens: "queue.Queue[tuple]" = queue.Queue()
+
+    async def pump():
+        try:
+            async for token in astream_research(query, session):
+                tokens.put(("token", token))
+            tokens.put(("done", None))
+        except asyncio.CancelledError:
+            tokens.put(("done", None))
+            raise
+        except BaseAIError as e:
+            tokens.put(("error", e))
+        except Exception as e:
+            logger.error("Research agent failed: %s", e)
+            tokens.put(("error", BaseAIError("Research agent failed to generate a response.")))
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _get_loop())
+    finished = False
     try:
-        logger.info(f"Running research for query: {query}")
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a helpful research assistant."},
-                {"role": "user", "content": query},
-            ],
-            temperature=0.3,
-        )
-        answer = response.choices[0].message.content
-        logger.info(f"Research result: {answer[:60]}...")
-        return answer
-    except Exception as e:
-        logger.error(f"Research agent failed: {e}")
-        raise BaseAIError("Research agent failed to generate a response.")
\ No newline at end of file
+        while True:
+            kind, value = tokens.get()
+            if kind == "token":
+                yield value
+                continue
+            finished = True
+            if kind == "error":
+                raise value
+            return
+    finally:
+        if not finished:
+            future.cancel()
+            logger.info("Research run cancelled by client")
+
+
+def run_research(query: str, session: Optional[ToolSession] = None) -> str:
+    """Blocking wrapper that returns the full answer."""
+    answer = "".join(stream_research(query, session=session))
+    logger.info("Research result: %.60s...", answer)
+    return answer
@@ -1,11 +1,56 @@
 import streamlit as st
-from .pipeline import answer_question
-from common.exceptions import BaseAIError  # updated import
+from common.exceptions import BaseAIError, InvalidYouTubeURLError  # updated import
+from common.metrics import start_exporter
+from common.warmup import start_warm_up
+
+PROGRESS_REFRESH_S = 0.5
+
+def _start_ingestion(url: str):
+    """Starts (or attaches to) background ingestion of the video; None for an invalid URL."""
+    from .ingest import get_ingestor
+    from .transcript_utils import extract_video_id
+
+    try:
+        video_id = extract_video_id(url)
+    except InvalidYouTubeURLError:
+        return None
+    ingestor = get_ingestor()
+    job = ingestor.get(video_id)
+    # A job this session started that failed is shown, not retried on every rerun;
+    # changing the URL or clicking Get Answer retries it
+    if job is not None and job.failed() and st.session_state.get("youtube_video") == video_id:
+        return job
+    st.session_state["youtube_video"] = video_id
+    return ingestor.ingest(video_id)
+
+def _forget_video():
+    st.session_state.pop("youtube_video", None)
+
+@st.fragment(run_every=PROGRESS_REFRESH_S)
+def _poll_progress(job):
+    # Refreshes only this fragment while ingestion runs; one full rerun when it finishes stops the polling
+    if job.done():
+        st.rerun()
+    st.progress(job.progress, text=f"Processing video: {job.stage}...")
+
+def _show_progress(job):
+    if not job.done():
+        _poll_progress(job)
+    elif not job.failed():
+        st.caption("✅ Video processed; ask away.")
+    else:
+        st.caption(f"⚠️ Processing failed: {job.future.exception()}")
 
 def run_app():
+    start_exporter()
+    start_warm_up("youtube")
     st.title("YouTube RAG")
 
-    url = st.text_input("Enter a YouTube URL:")
+    url = st.text_input("Enter a YouTube URL:", on_change=_forget_video)
+    # Fetch, split and embed the transcript while the question is being typed
+    job = _start_ingestion(url) if url else None
+    if job is not None:
+        _show_progress(job)
     query = st.text_input("Ask a question about the video:")
 
     if st.button("Get Answer"):
@@ -15,6 +60,9 @@ def run_app():
 
         with st.spinner("Processing..."):
             try:
+                # LangChain and the transcript API load on first use, not on page load
+                from .pipeline import answer_question
+
                 result = answer_question(url, query)
                 ans = result.get("answer", "")
                 if ans.startswith("Error:"):
@@ -0,0 +1,51 @@
+"""Calibrates the transcript retrieval-confidence threshold from a labelled question set.
+
+    python -m YouTube_RAG.calibrate --questions labelled.jsonl
+
+Each line is {"video_id": "...", "question": "...", "answerable": true|false}
+("url" may be given instead of "video_id"). Transcripts are indexed once per
+video; the threshold is written to `gating.json` in this package and applied by
+`build_retriever` to every video.
+"""
+import argparse
+from pathlib import Path
+
+from common.gating import TARGET_RECALL, calibrate_questions, read_questions, save_calibration
+
+from .retriever_utils import GATING_DIR, build_retriever
+from .transcript_utils import extract_video_id, get_transcript
+
+
+def calibrate_transcripts(questions_path: Path, target_recall: float = TARGET_RECALL) -> dict:
+    retrievers = {}
+
+    def top_score(record: dict) -> float:
+        video_id = record.get("video_id") or extract_video_id(record["url"])
+        if video_id not in retrievers:
+            retrievers[video_id] = build_retriever(get_transcript(video_id), k=1)
+        retriever = retrievers[video_id]
+        scores, _ = retriever.store.search(retriever.embed_query(record["question"]), k=1)
+        return float(scores[0][0])
+
+    calibration = calibrate_questions(read_questions(questions_path), top_score, target_recall)
+    embedding = next(iter(retrievers.values())).store.embedding if retrievers else None
+    save_calibration(GATING_DIR, calibration, embedding=embedding, videos=len(retrievers),
+                     questions=str(questions_path))
+    return calibration
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Calibrate the YouTube retrieval-confidence threshold.")
+    parser.add_argument("--questions", type=Path, required=True, help="JSONL of labelled questions.")
+    parser.add_argument("--target-recall", type=float, default=TARGET_RECALL,
+                        help="Share of answerable questions that must still reach the model.")
+    args = parser.parse_args()
+    calibration = calibrate_transcripts(args.questions, args.target_recall)
+    refused = calibration["unanswerable_refused"]
+    print(f"threshold {calibration['threshold']:.4f}, "
+          f"answerable recall {calibration['answerable_recall']:.2%}, "
+          f"unanswerable refused {'n/a' if refused is None else f'{refused:.2%}'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Background transcript ingestion, keyed by video_id.
+
+The app starts ingestion (fetch transcript, split, embed, index) as soon as a
+valid URL is entered, so by the time a question is asked it waits only on
+whatever ingestion remains. Requests for a video that is already being
+ingested attach to the in-flight job; finished retrievers are kept in a small
+LRU (YOUTUBE_INGEST_CACHE videos). A failed job keeps its error until the next
+`ingest` call for that video, which retries it.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from common.logger import get_logger
+from common.metrics import record_cache
+from common.telemetry import span
+
+from .retriever_utils import build_retriever
+from .transcript_utils import get_transcript
+
+logger = get_logger(__name__)
+
+WORKERS = int(os.getenv("YOUTUBE_INGEST_WORKERS", "2"))
+MAX_READY = int(os.getenv("YOUTUBE_INGEST_CACHE", "8"))
+
+# Share of the progress bar given to the transcript fetch; splitting/embedding fill the rest
+_FETCH_SHARE = 0.3
+
+
+class IngestJob:
+    """One video's ingestion; `stage` and `progress` (0..1) are updated by the worker thread."""
+
+    def __init__(self, video_id: str):
+        self.video_id = video_id
+        self.future: Future = Future()
+        self.stage = "queued"
+        self.progress = 0.0
+        self.started = time.monotonic()
+
+    def update(self, stage: str, progress: float) -> None:
+        self.stage, self.progress = stage, progress
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def failed(self) -> bool:
+        return self.future.done() and self.future.exception() is not None
+
+    def result(self, timeout: Optional[float] = None):
+        """The retriever, waiting for ingestion to finish; re-raises the ingestion error."""
+        return self.future.result(timeout)
+
+
+class Ingestor:
+    def __init__(self, workers: int = WORKERS, max_ready: int = MAX_READY):
+        self.max_ready = max_ready
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="youtube-ingest")
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ingest(self, video_id: str) -> IngestJob:
+        """Starts ingesting `video_id`, or returns the in-flight/finished job for it."""
+        with self._lock:
+            job = self._jobs.get(video_id)
+            if job is not None and not job.failed():
+                self._jobs.move_to_end(video_id)
+                record_cache("ingest", "youtube", hit=True)
+                return job
+            job = self._jobs[video_id] = IngestJob(video_id)
+            self._evict()
+        record_cache("ingest", "youtube", hit=False)
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, video_id: str) -> Optional[IngestJob]:
+        with self._lock:
+            return self._jobs.get(video_id)
+
+    def clear(self) -> None:
+        """Forgets every job; in-flight ones still finish for their current waiters."""
+        with self._lock:
+            self._jobs.clear()
+
+    def _evict(self) -> None:
+        # Only finished jobs are evicted; waiters of in-flight jobs keep their reference anyway
+        ready = [video_id for video_id, job in self._jobs.items() if job.done()]
+        for video_id in ready[:max(0, len(ready) - self.max_ready)]:
+            del self._jobs[video_id]
+
+    def _run(self, job: IngestJob) -> None:
+        def report(stage: str, fraction: float) -> None:
+            job.update(stage, _FETCH_SHARE + (1 - _FETCH_SHARE) * fraction)
+
+        try:
+            with span("ingest_video", "request", lab="youtube", video_id=job.video_id):
+                job.update("fetching transcript", 0.0)
+                text = get_transcript(job.video_id)
+                job.update("splitting", _FETCH_SHARE)
+                retriever = build_retriever(text, progress=report)
+        except BaseException as e:
+            logger.error("Ingestion of %s failed: %s", job.video_id, e)
+            job.update("failed", job.progress)
+            job.future.set_exception(e)
+            return
+        job.update("ready", 1.0)
+        logger.info("Ingested %s in %.2fs", job.video_id, time.monotonic() - job.started)
+        job.future.set_result(retriever)
+
+
+_ingestor: Optional[Ingestor] = None
+_ingestor_lock = threading.Lock()
+
+
+def get_ingestor() -> Ingestor:
+    """Returns the process-wide ingestor (shared by every Streamlit session)."""
+    global _ingestor
+    with _ingestor_lock:
+        if _ingestor is None:
+            _ingestor = Ingestor()
+        return _ingestor
@@ -1,16 +1,20 @@
 from dotenv import load_dotenv
-from .transcript_utils import extract_video_id, get_transcript
-from .retriever_utils import build_retriever
+from .transcript_utils import extract_video_id
+from .ingest import get_ingestor
 from .qa_utils import get_answer
 from common.exceptions import BaseAIError  # updated import
+from common.metrics import record_error
+from common.telemetry import traced
 
 load_dotenv()
 
+@traced("answer_question", "request", lab="youtube")
 def answer_question(url: str, question: str):
     try:
         video_id = extract_video_id(url)
-        text = get_transcript(video_id)
-        retriever = build_retriever(text)
+        # Attaches to the ingestion the app started when the URL was entered, if any
+        retriever = get_ingestor().ingest(video_id).result()
         return get_answer(question, retriever)  # returns {"answer","context"}
     except BaseAIError as e:  # updated exception
+        record_error("youtube", e)
         return {"answer": f"Error: {str(e)}", "context": []}
@@ -1,76 +1,51 @@
-import os
-
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
+from common.llm_gateway import get_gateway
 from common.logger import get_logger
+from common.metrics import record_gate
+from common.prompts import build_messages, context_blocks
+from common.telemetry import span
 from common.exceptions import OpenAIError
 
-try:  # RetrievalQA only exists in newer releases
-    from langchain.chains import RetrievalQA
-except ImportError:
-    RetrievalQA = None
-
-try:
-    from langchain.chains.combine_documents import create_stuff_documents_chain
-    from langchain.chains.retrieval import create_retrieval_chain
-except ImportError:  # keep fallback graceful
-    create_stuff_documents_chain = None
-    create_retrieval_chain = None
-
 logger = get_logger(__name__)
 
-_RAG_PROMPT = ChatPromptTemplate.from_template(
+CHAT_MODEL = "gpt-4o-mini"
+NO_ANSWER = "I don't know; the video does not seem to cover that."
+
+_INSTRUCTIONS = (
     "You are an assistant for question-answering tasks.\n"
     "Use the following pieces of retrieved context to answer the question.\n"
     "If you don't know the answer, just say you don't know.\n"
-    "Keep the answer concise.\n\n"
-    "Question: {input}\n"
-    "Context:\n{context}\n\n"
-    "Answer:"
+    "Keep the answer concise."
 )
 
-def get_answer(question: str, retriever):
-    try:
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.1,
-            api_key=os.getenv("OPENAI_API_KEY"),
-        )
-        if RetrievalQA is not None:
-            rag_chain = RetrievalQA.from_chain_type(
-                llm=llm,
-                retriever=retriever,
-                chain_type="stuff",
-                chain_type_kwargs={"prompt": _RAG_PROMPT},
-                return_source_documents=True,
-            )
-            result = rag_chain({"query": question})
-            logger.info(f"Answered: {question[:60]} -> {result.get('result','')[:60]}")
-            return {
-                "answer": result.get("result", ""),
-                "context": result.get("source_documents", []),
-            }
-        if create_stuff_documents_chain is not None and create_retrieval_chain is not None:
-            doc_chain = create_stuff_documents_chain(llm, _RAG_PROMPT)
-            rag_chain = create_retrieval_chain(retriever, doc_chain)
-            result = rag_chain.invoke({"input": question})
-            logger.info(f"Answered: {question[:60]} -> {result.get('answer','')[:60]}")
-            return {"answer": result.get("answer", ""), "context": result.get("context", [])}
-        vectorstore = getattr(retriever, "vectorstore", None)
-        search_kwargs = dict(getattr(retriever, "search_kwargs", {}) or {})
-        search_kwargs.setdefault("k", 3)
+def _retrieve(question: str, retriever):
+    vectorstore = getattr(retriever, "vectorstore", None)
+    search_kwargs = dict(getattr(retriever, "search_kwargs", {}) or {})
+    search_kwargs.setdefault("k", 3)
 
+    with span("similarity_search", "search", lab="youtube"):
         if vectorstore:
-            docs = vectorstore.similarity_search(question, **search_kwargs)
-        else:
-            docs = retriever.invoke(question) if hasattr(retriever, "invoke") else []
+            return vectorstore.similarity_search(question, **search_kwargs)
+        return retriever.invoke(question) if hasattr(retriever, "invoke") else []
 
-        context_str = "\n\n".join(doc.page_content or "" for doc in docs)
-        prompt = _RAG_PROMPT.format_prompt(input=question, context=context_str)
-        response = llm.invoke(prompt.to_messages())
-        answer = response.content if hasattr(response, "content") else str(response)
-        logger.info(f"Answered (manual): {question[:60]} -> {answer[:60]}")
+def get_answer(question: str, retriever):
+    # Retrieval and the "stuff" prompt are done here rather than through a
+    # LangChain chain so that the completion goes through the shared LLM gateway.
+    try:
+        docs = _retrieve(question, retriever)
+        if getattr(retriever, "min_score", None) is not None:
+            # Gated retriever: nothing at or above the calibrated threshold, so skip the completion
+            record_gate("youtube", "transcript", bool(docs))
+            if not docs:
+                logger.info("Refused below retrieval threshold: %.60s", question)
+                return {"answer": NO_ANSWER, "context": []}
+        # Transcript order keeps the context (and the cached prompt prefix) stable across questions
+        context_str = context_blocks(
+            ((doc.metadata.get("chunk", i), doc.page_content or "") for i, doc in enumerate(docs)), show_keys=False
+        )
+        messages = build_messages(_INSTRUCTIONS, context_str, question)
+        answer = get_gateway().complete(CHAT_MODEL, messages, temperature=0.1, cache="youtube")
+        logger.info("Answered: %.60s -> %.60s", question, answer)
         return {"answer": answer, "context": docs}
     except Exception as e:
-        logger.error(f"OpenAI/LangChain failed: {e}", exc_info=True)
+        logger.error("OpenAI/LangChain failed: %s", e, exc_info=True)
         raise OpenAIError(f"Something went wrong generating the answer: {e}")
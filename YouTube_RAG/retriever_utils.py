@@ -1,26 +1,55 @@
-import os
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
+from pathlib import Path
+
+from common.embeddings import get_provider
+from common.gating import load_threshold
 from common.logger import get_logger
+from common.telemetry import span
 from common.exceptions import RAGException  # now exists
 
 logger = get_logger(__name__)
 
-def build_retriever(text: str, k: int = 3):
+# OpenAI model used when EMBEDDING_PROVIDER is openai (see common.embeddings)
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Holds gating.json, calibrated with `python -m YouTube_RAG.calibrate`
+GATING_DIR = Path(__file__).resolve().parent
+
+# Chunks embedded per call when reporting progress (the providers' own batch size)
+EMBED_BATCH = 256
+
+def build_retriever(text: str, k: int = 3, fetch_k: int = 12, min_score=None, progress=None):
+    """Retriever over the transcript; it returns no documents when the best match is below min_score.
+
+    min_score defaults to the calibrated threshold in GATING_DIR (none: no gating).
+    `progress(stage, fraction)` is called as splitting and embedding advance.
+    """
+    import numpy as np
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    from common.vector_store import VectorStore
+
     try:
         splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
         chunks = splitter.split_text(text)
-        logger.info(f"Split transcript into {len(chunks)} chunks")
+        logger.info("Split transcript into %s chunks", len(chunks))
+        report = progress or (lambda stage, fraction: None)
 
-        embeddings = OpenAIEmbeddings(
-            model="text-embedding-3-small",
-            api_key=os.getenv("OPENAI_API_KEY"),
-        )
-        vectorstore = FAISS.from_texts(chunks, embeddings)
-        logger.info("Created FAISS vectorstore")
+        embedder = get_provider(EMBEDDING_MODEL, lab="youtube")
+        with span("build_vectorstore", "embed", lab="youtube", chunks=len(chunks), provider=embedder.name):
+            embedder.fit(chunks)
+            batches = []
+            for start in range(0, len(chunks), EMBED_BATCH):
+                report("embedding", start / len(chunks))
+                batches.append(embedder.embed(chunks[start:start + EMBED_BATCH]))
+            report("indexing", 1.0)
+            vectors = np.vstack(batches)
+            vectorstore = VectorStore(vectors.shape[1])
+            vectorstore.add(vectors, {"text": chunks, "chunk": list(range(len(chunks)))})
+            vectorstore.embedding = embedder.info()
+        logger.info("Created vector store")
 
-        return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": k})
+        # Over-fetch and re-rank with MMR: repetitive speech yields many near-duplicate chunks
+        if min_score is None:
+            min_score = load_threshold(GATING_DIR, embedding=vectorstore.embedding)
+        return vectorstore.as_retriever(embed_query=embedder.embed_query, k=k, fetch_k=fetch_k, min_score=min_score)
     except Exception as e:
-        logger.error(f"Retriever build failed: {e}")
+        logger.error("Retriever build failed: %s", e)
         raise RAGException("Could not build retriever from transcript.")
@@ -1,9 +1,23 @@
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
+import re
+from pathlib import Path
+
 from common.logger import get_logger
 from common.exceptions import TranscriptNotFoundError, InvalidYouTubeURLError
 
 logger = get_logger(__name__)
 
+# Fetched transcripts are cached on disk; the Research Agent searches them too.
+TRANSCRIPT_CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "transcripts"
+
+# Video ids are also cache filenames, so anything else is rejected
+_VIDEO_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+def _check_video_id(video_id: str) -> str:
+    if not _VIDEO_ID.match(video_id):
+        logger.error("Invalid YouTube video_id: %r", video_id)
+        raise InvalidYouTubeURLError("Invalid YouTube URL format.")
+    return video_id
+
 def extract_video_id(url: str) -> str:
     """Extracts the YouTube video ID from common URL formats."""
     if "watch?v=" in url:
@@ -11,10 +25,11 @@ def extract_video_id(url: str) -> str:
     elif "youtu.be/" in url:
         video_id = url.split("youtu.be/")[-1].split("?")[0]
     else:
-        logger.error(f"Invalid YouTube URL: {url}")
+        logger.error("Invalid YouTube URL: %s", url)
         raise InvalidYouTubeURLError("Invalid YouTube URL format.")
 
-    logger.info(f"Extracted video_id: {video_id}")
+    _check_video_id(video_id)
+    logger.info("Extracted video_id: %s", video_id)
     return video_id
 
 def get_transcript(video_id: str) -> str:
@@ -22,15 +37,25 @@ def get_transcript(video_id: str) -> str:
     Fetches transcript using the latest youtube-transcript-api API.
     Returns a single concatenated string from transcript segments.
     """
+    cached = TRANSCRIPT_CACHE_DIR / f"{_check_video_id(video_id)}.txt"
+    if cached.exists():
+        text = cached.read_text(encoding="utf-8")
+        logger.info("Loaded cached transcript for %s: %s chars", video_id, len(text))
+        return text
+
+    from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
+
     try:
         ytt = YouTubeTranscriptApi()
         fetched = ytt.fetch(video_id)  # modern method
         raw = fetched.to_raw_data()    # [{'text','start','duration'}, ...]
 
         text = " ".join(d.get("text", "") for d in raw if d.get("text"))
-        logger.info(f"Fetched transcript: {len(raw)} segments, {len(text)} chars")
+        logger.info("Fetched transcript: %s segments, %s chars", len(raw), len(text))
+        TRANSCRIPT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        cached.write_text(text, encoding="utf-8")
         return text
 
     except (TranscriptsDisabled, NoTranscriptFound):
-        logger.error(f"No transcript available for video_id={video_id}")
+        logger.error("No transcript available for video_id=%s", video_id)
         raise TranscriptNotFoundError("Transcript not available for this video.")
@@ -0,0 +1,61 @@
+"""Environment and data fixtures shared by the benchmark and load harnesses."""
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+CONTRACT_PDF = ROOT_DIR / "temp_contract.pdf"
+
+
+def configure_environment(stub_url: str, workdir: Path) -> None:
+    """Points every client at the stub and keeps caches/telemetry out of the repo."""
+    os.environ.update({
+        "OPENAI_API_KEY": "stub-key",
+        "OPENAI_BASE_URL": stub_url,
+        "OPENAI_API_BASE": stub_url,
+        "LLM_CACHE_BYPASS": "1",
+        "TELEMETRY_EXPORTER": "none",
+        "NETZERO_CACHE_PATH": str(workdir / "netzero_cache.sqlite3"),
+    })
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+
+
+def unlimit_gateway() -> None:
+    """Lifts the gateway's per-model rate limits, so the stub's latency is all that is measured."""
+    from common.llm_gateway import MODEL_LIMITS, get_gateway
+
+    gateway = get_gateway()
+    for model in list(MODEL_LIMITS):
+        gateway.set_limits(model, 10 ** 9, 10 ** 12)
+
+
+def synthetic_text(words: int, seed: int = 7) -> str:
+    import numpy as np
+
+    vocab = [f"w{i}" for i in range(5000)] + ["energy", "renewable", "contract", "ਗੁਰੂ", "ਸਾਹਿਬ"]
+    rng = np.random.default_rng(seed)
+    return " ".join(vocab[i] for i in rng.integers(0, len(vocab), size=words))
+
+
+def gurbani_resources(args, workdir: Path):
+    """(OpenAI client, store) for a Gurbani index built from `args.index_words` synthetic words."""
+    from openai import OpenAI
+    from Gurbani_OCR_RAG import ask, build_index as bi
+
+    data_dir = workdir / "gurbani_e2e"
+    data_dir.mkdir(exist_ok=True)
+    (data_dir / "Gurbani.txt").write_text(synthetic_text(args.index_words), encoding="utf-8")
+    bi.DATA_DIR, bi.STORE_DIR, bi.CHUNKS_PATH = data_dir, data_dir / "store", data_dir / "chunks.json"
+    bi.build_index()
+    return OpenAI(), ask.load_store(bi.STORE_DIR)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
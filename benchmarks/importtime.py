@@ -0,0 +1,148 @@
+"""Cold-start import profile of each Streamlit page.
+
+    python -m benchmarks.importtime                     # JSON to importtime_output.json
+    python -m benchmarks.importtime --repeat 5 --top 15
+    python -m benchmarks.importtime --output new.json --compare importtime_output.json
+
+For every page (Home.py and pages/*.py) the page's own top-level imports are run
+in a fresh interpreter under `python -X importtime`. The report records the total
+import time (median over --repeat runs), the slowest modules by self time, and
+which heavy stacks were loaded. Heavy stacks should not appear for any page; they
+are meant to load on first use.
+"""
+import argparse
+import ast
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_OUTPUT = ROOT_DIR / "importtime_output.json"
+HEAVY_PACKAGES = ("langchain", "langchain_core", "langchain_community", "langchain_openai",
+                  "langgraph", "faiss", "openai", "numpy", "flask", "pdfplumber", "youtube_transcript_api")
+
+
+def page_files() -> List[Path]:
+    return [ROOT_DIR / "Home.py", *sorted((ROOT_DIR / "pages").glob("*.py"))]
+
+
+def page_imports(path: Path) -> List[str]:
+    """Top-level import statements of a page, as source lines."""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    return [ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def parse_importtime(stderr: str) -> List[dict]:
+    """Parses `-X importtime` lines into {module, self_us, cumulative_us, depth}."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append({"module": name.strip(), "self_us": int(self_us), "cumulative_us": int(cumulative_us),
+                     "depth": depth})
+    return rows
+
+
+def _run_importtime(code: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=ROOT_DIR, capture_output=True, text=True)
+
+
+def startup_modules() -> set:
+    """Modules the interpreter imports before running any code (site, encodings, ...)."""
+    return {r["module"] for r in parse_importtime(_run_importtime("pass").stderr)}
+
+
+def profile_page(path: Path, repeat: int, top: int, baseline: set) -> dict:
+    code = "\n".join(page_imports(path))
+    totals, walls = [], []
+    rows: List[dict] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = _run_importtime(code)
+        walls.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+            return {"page": path.name, "error": error}
+        rows = [r for r in parse_importtime(proc.stderr) if r["module"] not in baseline]
+        # top-level rows are imported directly by the page; nested rows are already in their cumulative time
+        totals.append(sum(r["cumulative_us"] for r in rows if r["depth"] == 0) / 1000)
+    loaded = {r["module"] for r in rows}
+    return {
+        "page": path.name,
+        "imports": code.splitlines(),
+        "import_ms": round(statistics.median(totals), 1),
+        "process_ms": round(statistics.median(walls), 1),
+        "heavy_loaded": sorted(p for p in HEAVY_PACKAGES if p in loaded),
+        "slowest": [
+            {"module": r["module"], "self_ms": round(r["self_us"] / 1000, 2),
+             "cumulative_ms": round(r["cumulative_us"] / 1000, 2)}
+            for r in sorted(rows, key=lambda r: r["self_us"], reverse=True)[:top]
+        ],
+    }
+
+
+def compare(current: dict, baseline_path: Path) -> None:
+    previous = json.loads(baseline_path.read_text(encoding="utf-8"))
+    baseline = {r["page"]: r for r in previous["results"]}
+    print(f"\nComparison against {baseline_path} ({previous['meta'].get('commit', '?')})")
+    print(f"{'page':<28}{'base ms':>10}{'new ms':>10}{'delta':>9}")
+    for result in current["results"]:
+        old: Optional[dict] = baseline.get(result["page"])
+        if not old or "error" in old or "error" in result:
+            continue
+        delta = (result["import_ms"] - old["import_ms"]) / max(old["import_ms"], 1e-9) * 100
+        print(f"{result['page']:<28}{old['import_ms']:>10.1f}{result['import_ms']:>10.1f}{delta:>+8.1f}%")
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Profile cold-start import time per Streamlit page.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per page; the median is reported.")
+    parser.add_argument("--top", type=int, default=10, help="Slowest modules listed per page.")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--compare", type=Path, help="Previous report to diff against.")
+    args = parser.parse_args(argv)
+
+    baseline = startup_modules()
+    results = []
+    for path in page_files():
+        result = profile_page(path, args.repeat, args.top, baseline)
+        results.append(result)
+        if "error" in result:
+            print(f"{result['page']:<28} error: {result['error']}")
+        else:
+            heavy = ", ".join(result["heavy_loaded"]) or "-"
+            print(f"{result['page']:<28}{result['import_ms']:>9.1f} ms   heavy: {heavy}")
+
+    report: Dict[str, object] = {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nWrote {len(results)} page profiles to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+"""Concurrent load and soak tests against the labs, with latency/throughput SLO gates.
+
+    python -m benchmarks.load --target api_ask --concurrency 1,8,32 --duration 30
+    python -m benchmarks.load --target api_ask --mode open --rate 40 --concurrency 64 --duration 60
+    python -m benchmarks.load --target gurbani_ask --duration 1800 --sample-every 30      # soak
+    python -m benchmarks.load --target api_ask --slo 'p95_ms<=500' --slo 'api_ask:throughput_per_s>=50'
+    python -m benchmarks.load --output new.json --compare load_output.json
+
+Targets are the Gurbani JSON endpoint (`api_ask`, over HTTP to an in-process
+threaded server) and the pipeline functions behind the Streamlit pages. All
+OpenAI traffic goes to the stub, run as a separate process so its own memory
+does not count against the labs.
+
+Closed loop: `concurrency` clients, each sending its next request as soon as
+the previous one returns. Open loop: Poisson arrivals at `rate` per second,
+served by up to `concurrency` workers; latency is measured from the scheduled
+arrival, so queueing under overload is counted instead of hidden.
+
+Each level starts with a short closed-loop warm-up at its concurrency (filling
+connection pools and caches). While traffic runs, the harness samples its own
+RSS, open file descriptors and TCP connections (Linux /proc) and reports their
+growth from the end of the warm-up to the end of the run. A soak is just a long
+run: steady RSS/fd/connection growth there points at a leak. SLOs are `[target:]metric<=value` or `>=value`
+over any numeric result field; the exit code is 1 when one is missed.
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fixtures import (
+    CONTRACT_PDF,
+    ROOT_DIR,
+    configure_environment,
+    git_commit,
+    gurbani_resources,
+    synthetic_text,
+    unlimit_gateway,
+)
+from benchmarks.run import compare, peak_rss_mb, percentile
+
+DEFAULT_OUTPUT = ROOT_DIR / "load_output.json"
+TARGETS = ("api_ask", "gurbani_ask", "youtube_answer", "legal_analyze", "netzero_graph")
+QUESTIONS = (
+    "What does ਗੁਰੂ teach?",
+    "What life lesson is highlighted?",
+    "How should one face hardship?",
+    "What is said about humility?",
+)
+_SLO_RE = re.compile(r"^(?:(\w+):)?(\w+)\s*(<=|>=)\s*([-+\d.eE]+)$")
+_TCP_STATES = {"01": "established", "08": "close_wait", "06": "time_wait"}
+
+
+# ---------------- resources ----------------
+def _socket_inodes() -> set:
+    inodes = set()
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            link = os.readlink(f"/proc/self/fd/{fd}")
+        except OSError:
+            continue
+        if link.startswith("socket:["):
+            inodes.add(link[8:-1])
+    return inodes
+
+
+def resource_sample() -> dict:
+    """Current RSS, open fds, threads and this process's TCP connections by state."""
+    sample = {"t": time.time(), "threads": threading.active_count()}
+    if not os.path.isdir("/proc/self/fd"):
+        # Non-Linux: only the peak RSS is available
+        sample["rss_mb"] = round(peak_rss_mb(), 1)
+        return sample
+    with open("/proc/self/statm") as fh:
+        sample["rss_mb"] = round(int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20, 1)
+    inodes = _socket_inodes()
+    sample["fds"] = len(os.listdir("/proc/self/fd"))
+    sample["sockets"] = len(inodes)
+    states = Counter()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as fh:
+                rows = fh.read().splitlines()[1:]
+        except OSError:
+            continue
+        for row in rows:
+            fields = row.split()
+            if fields[9] in inodes:
+                states[_TCP_STATES.get(fields[3], "other")] += 1
+    sample["connections"] = states["established"]
+    sample["close_wait"] = states["close_wait"]
+    return sample
+
+
+class Sampler:
+    """Takes a resource sample every `interval` seconds on a daemon thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: List[dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.samples.append(resource_sample())
+
+    def __enter__(self) -> "Sampler":
+        self.samples.append(resource_sample())
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        gc.collect()
+        self.samples.append(resource_sample())
+
+
+def _slope_per_min(samples: List[dict], key: str) -> Optional[float]:
+    points = [(s["t"], s[key]) for s in samples if key in s]
+    if len(points) < 3:
+        return None
+    t0 = points[0][0]
+    xs, ys = [(t - t0) / 60 for t, _ in points], [y for _, y in points]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mean_x) ** 2 for x in xs)
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var, 3) if var else None
+
+
+# ---------------- traffic ----------------
+def _timed(call: Callable[[int], None], i: int, since: float, samples: list) -> None:
+    try:
+        call(i)
+        error = None
+    except Exception as e:
+        error = type(e).__name__
+    samples.append((since, (time.perf_counter() - since) * 1000, error))
+
+
+def closed_loop(call: Callable[[int], None], concurrency: int, duration: float) -> list:
+    """Each of `concurrency` clients sends its next request as soon as the previous one returns."""
+    samples: list = []
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        while time.perf_counter() < deadline:
+            _timed(call, next(counter), time.perf_counter(), samples)
+
+    clients = [threading.Thread(target=client, name=f"load-client-{n}") for n in range(concurrency)]
+    for thread in clients:
+        thread.start()
+    for thread in clients:
+        thread.join()
+    return samples
+
+
+def open_loop(call: Callable[[int], None], rate: float, concurrency: int, duration: float, seed: int = 0) -> list:
+    """Poisson arrivals at `rate`/s; latency counts from the scheduled arrival, including queueing."""
+    samples: list = []
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    offset = 0.0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load-worker") as pool:
+        for i in itertools.count():
+            arrival = start + offset
+            if offset >= duration:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_timed, call, i, arrival, samples)
+            offset += rng.expovariate(rate)
+    return samples
+
+
+def summarise(samples: list, elapsed: float, sample_every: float) -> dict:
+    latencies = [latency for _, latency, error in samples if error is None]
+    errors = Counter(error for _, _, error in samples if error is not None)
+    result = {
+        "requests": len(samples),
+        "errors": sum(errors.values()),
+        "error_rate": round(sum(errors.values()) / len(samples), 4) if samples else 0.0,
+        "errors_by_type": dict(errors),
+        "throughput_per_s": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+    }
+    if latencies:
+        result.update({
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+            "max_ms": round(max(latencies), 3),
+        })
+    # Error rate per sampling window, so a soak shows when errors started
+    if samples and sample_every:
+        start = min(since for since, _, _ in samples)
+        windows: Dict[int, list] = {}
+        for since, _, error in samples:
+            windows.setdefault(int((since - start) // sample_every), []).append(error is not None)
+        result["error_rate_windows"] = [round(sum(w) / len(w), 4) for _, w in sorted(windows.items())]
+    return result
+
+
+def resource_growth(samples: List[dict]) -> dict:
+    first, last = samples[0], samples[-1]
+    growth = {
+        "rss_mb_start": first["rss_mb"],
+        "rss_mb_end": last["rss_mb"],
+        "rss_growth_mb": round(last["rss_mb"] - first["rss_mb"], 1),
+        "rss_mb_per_min": _slope_per_min(samples, "rss_mb"),
+        "thread_growth": last["threads"] - first["threads"],
+    }
+    if "fds" in first:
+        growth.update({
+            "fd_growth": last["fds"] - first["fds"],
+            "connection_growth": last["connections"] - first["connections"],
+            "close_wait_end": last["close_wait"],
+        })
+    return growth
+
+
+# ---------------- targets ----------------
+def target_api_ask(args, workdir: Path):
+    import logging
+    from werkzeug.serving import make_server
+    from Gurbani_OCR_RAG import ask
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # no access log line per request
+    server = make_server("127.0.0.1", 0, ask.create_app(*gurbani_resources(args, workdir)), threaded=True)
+    threading.Thread(target=server.serve_forever, name="load-flask", daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/api/ask"
+
+    def call(i: int) -> None:
+        body = json.dumps({"question": QUESTIONS[i % len(QUESTIONS)]}).encode("utf-8")
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=args.timeout) as resp:
+            if "answer" not in json.loads(resp.read()):
+                raise RuntimeError("api_ask returned no answer")
+
+    return call, server.shutdown
+
+
+def target_gurbani_ask(args, workdir: Path):
+    from Gurbani_OCR_RAG import ask
+
+    client, store = gurbani_resources(args, workdir)
+    return lambda i: ask.ask_question(QUESTIONS[i % len(QUESTIONS)], client, store), None
+
+
+def target_youtube_answer(args, workdir: Path):
+    from YouTube_RAG import pipeline, transcript_utils
+
+    transcript_utils.TRANSCRIPT_CACHE_DIR = workdir / "transcripts"
+    transcript_utils.TRANSCRIPT_CACHE_DIR.mkdir(exist_ok=True)
+    # Video ids must look like real ones (11 characters)
+    videos = [f"loadvid{n:04d}" for n in range(args.videos)]
+    for n, video_id in enumerate(videos):
+        (transcript_utils.TRANSCRIPT_CACHE_DIR / f"{video_id}.txt").write_text(
+            synthetic_text(args.transcript_words, seed=n), encoding="utf-8")
+
+    def call(i: int) -> None:
+        url = f"https://www.youtube.com/watch?v={videos[i % len(videos)]}"
+        result = pipeline.answer_question(url, QUESTIONS[i % len(QUESTIONS)])
+        if result["answer"].startswith("Error:"):
+            raise RuntimeError(result["answer"])
+
+    return call, None
+
+
+def target_legal_analyze(args, workdir: Path):
+    from Legal_Doc_Analyzer import pipeline, store
+
+    store.CONTRACT_STORE_DIR = workdir / "contracts"
+
+    def call(i: int) -> None:
+        with CONTRACT_PDF.open("rb") as fh:
+            answer = pipeline.analyze_contract(fh, "What is the termination notice period?")
+        if answer.startswith("Error:"):
+            raise RuntimeError(answer)
+
+    return call, None
+
+
+def target_netzero_graph(args, workdir: Path):
+    import io
+    from NetZero_Advisor.graph import get_graph
+    from NetZero_Advisor.payload import release_payload, spool_upload
+
+    report = ("site,month,energy_kwh,fuel\n" + "\n".join(
+        f"site{i % 7},{i % 12},{i * 13 % 997},energy" for i in range(args.netzero_rows)
+    )).encode("utf-8")
+    graph = get_graph()
+    # Call indexes restart with every loop (warm-up included), so uniqueness comes from this counter
+    calls = itertools.count()
+
+    def call(i: int) -> None:
+        # A distinct row and goal per call; with repeated inputs every node would be a memo cache hit
+        n = next(calls)
+        payload = spool_upload(io.BytesIO(report + f"\nload{n},{n % 12},{n},energy".encode("utf-8")),
+                               name="load.csv")
+        try:
+            result = graph.invoke({"payload": payload, "goal": f"Net zero by {2035 + i % 4 * 5} (site load{n})"})
+        finally:
+            release_payload(payload)
+        if "plan" not in result:
+            raise RuntimeError("NetZero graph produced no plan")
+
+    return call, None
+
+
+SETUPS: Dict[str, Callable] = {
+    "api_ask": target_api_ask,
+    "gurbani_ask": target_gurbani_ask,
+    "youtube_answer": target_youtube_answer,
+    "legal_analyze": target_legal_analyze,
+    "netzero_graph": target_netzero_graph,
+}
+
+
+# ---------------- SLOs ----------------
+def parse_slo(text: str) -> Tuple[Optional[str], str, str, float]:
+    match = _SLO_RE.match(text.replace(" ", ""))
+    if not match:
+        raise argparse.ArgumentTypeError(f"SLO {text!r} is not [target:]metric<=value or >=value")
+    target, metric, op, value = match.groups()
+    return target, metric, op, float(value)
+
+
+def check_slos(result: dict, slos: List[tuple]) -> List[dict]:
+    checks = []
+    for target, metric, op, limit in slos:
+        if target and target != result["name"]:
+            continue
+        value = result.get(metric, result.get("resources", {}).get(metric))
+        passed = value is not None and (value <= limit if op == "<=" else value >= limit)
+        checks.append({"slo": f"{metric}{op}{limit:g}", "value": value, "passed": passed})
+    return checks
+
+
+def unrun_slos(results: List[dict], slos: List[tuple]) -> List[dict]:
+    """Failed results for SLOs naming a target that produced no result, so they cannot pass unchecked."""
+    ran = {result["name"] for result in results}
+    missing: Dict[str, List[dict]] = {}
+    for target, metric, op, limit in slos:
+        if target and target not in ran:
+            missing.setdefault(target, []).append({"slo": f"{metric}{op}{limit:g}", "value": None, "passed": False})
+    return [{"name": target, "error": "target was not run", "slo": checks} for target, checks in missing.items()]
+
+
+# ---------------- driver ----------------
+@contextmanager
+def stub_process(args):
+    """The stub OpenAI API in its own process, on a free port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    cmd = [sys.executable, "-m", "benchmarks.stub_openai", "--port", str(port),
+           "--chat-latency", str(args.chat_latency), "--embed-latency", str(args.embed_latency),
+           "--prefill-ms-per-1k", str(args.prefill_ms_per_1k)]
+    proc = subprocess.Popen(cmd, cwd=ROOT_DIR, stdout=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("stub OpenAI API did not start")
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def run_target(name: str, args, workdir: Path, slos: List[tuple]) -> List[dict]:
+    call, cleanup = SETUPS[name](args, workdir)
+    results = []
+    try:
+        for concurrency in args.concurrency:
+            # Fills connection pools and caches at this concurrency, so growth below is not pool warm-up
+            closed_loop(call, concurrency, args.warmup)
+            params = {"mode": args.mode, "concurrency": concurrency, "duration_s": args.duration}
+            if args.mode == "open":
+                params["rate"] = args.rate
+            start = time.perf_counter()
+            with Sampler(args.sample_every) as sampler:
+                if args.mode == "open":
+                    samples = open_loop(call, args.rate, concurrency, args.duration, seed=args.seed)
+                else:
+                    samples = closed_loop(call, concurrency, args.duration)
+            result = {"name": name, "params": params,
+                      **summarise(samples, time.perf_counter() - start, args.sample_every),
+                      "resources": resource_growth(sampler.samples), "samples": sampler.samples}
+            result["slo"] = check_slos(result, slos)
+            resources = result["resources"]
+            print(f"{name:<15} {args.mode:<6} c={concurrency:<4} n={result['requests']:<6} "
+                  f"p50={result.get('p50_ms', 0):>8.1f}ms p95={result.get('p95_ms', 0):>8.1f}ms "
+                  f"p99={result.get('p99_ms', 0):>8.1f}ms {result['throughput_per_s']:>8.1f}/s "
+                  f"err={result['error_rate']:.2%} rss+{resources['rss_growth_mb']}MB "
+                  f"fd+{resources.get('fd_growth', 'n/a')} conn+{resources.get('connection_growth', 'n/a')}")
+            for check in result["slo"]:
+                if not check["passed"]:
+                    print(f"  SLO missed: {check['slo']} (got {check['value']})")
+            results.append(result)
+    finally:
+        if cleanup:
+            cleanup()
+    return results
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load and soak tests against the labs, using a stub OpenAI API.")
+    parser.add_argument("--target", action="append", choices=TARGETS, help="Target to load (repeatable).")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed")
+    parser.add_argument("--concurrency", type=lambda s: [int(x) for x in s.split(",")], default=[8],
+                        help="Clients (closed) or max in-flight requests (open); a comma list runs each level.")
+    parser.add_argument("--rate", type=float, default=20.0, help="Open-loop arrivals per second.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of traffic per level.")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of closed-loop traffic before each level.")
+    parser.add_argument("--sample-every", type=float, default=1.0, help="Resource sampling interval (s).")
+    parser.add_argument("--timeout", type=float, default=60.0, help="HTTP timeout per request (s).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--slo", action="append", type=parse_slo, default=[],
+                        help="[target:]metric<=value or >=value, e.g. 'p95_ms<=500' (repeatable).")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where to write the JSON report.")
+    parser.add_argument("--compare", type=Path, help="Previous report to diff against.")
+    parser.add_argument("--index-words", type=int, default=15000)
+    parser.add_argument("--transcript-words", type=int, default=8000)
+    parser.add_argument("--videos", type=int, default=4, help="Distinct videos for youtube_answer.")
+    parser.add_argument("--netzero-rows", type=int, default=20000)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Stub latency per embeddings call (s).")
+    parser.add_argument("--chat-latency", type=float, default=0.05, help="Stub latency per chat call (s).")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0,
+                        help="Stub latency per 1k uncached prompt tokens (ms).")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = _parse_args(argv)
+    names = args.target or ["api_ask"]
+
+    with stub_process(args) as stub_url, tempfile.TemporaryDirectory(prefix="load_") as tmp:
+        workdir = Path(tmp)
+        configure_environment(stub_url, workdir)
+        unlimit_gateway()
+        results = []
+        for name in names:
+            try:
+                results.extend(run_target(name, args, workdir, args.slo))
+            except Exception as e:
+                print(f"{name} failed: {e}", file=sys.stderr)
+                results.append({"name": name, "error": f"{type(e).__name__}: {e}"})
+        for result in unrun_slos(results, args.slo):
+            print(f"{result['name']} SLOs missed: target was not run "
+                  f"({', '.join(check['slo'] for check in result['slo'])})", file=sys.stderr)
+            results.append(result)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "stub": {"embed_latency": args.embed_latency, "chat_latency": args.chat_latency,
+                     "prefill_ms_per_1k": args.prefill_ms_per_1k},
+            "slos": [f"{t + ':' if t else ''}{m}{op}{v:g}" for t, m, op, v in args.slo],
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nWrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+    missed = [check for r in results for check in r.get("slo", []) if not check["passed"]]
+    if missed or any("error" in r for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
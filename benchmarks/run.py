@@ -0,0 +1,370 @@
+"""Offline performance benchmarks for the labs.
+
+    python -m benchmarks.run                       # all benchmarks, JSON to bench_output.json
+    python -m benchmarks.run --only retrieve_context --corpus-sizes 1000,10000
+    python -m benchmarks.run --compare previous.json
+
+Every OpenAI call goes to the local stub (benchmarks.stub_openai), so runs are
+deterministic and need no API key. Each benchmark runs in its own subprocess so
+its peak RSS is isolated; pass --in-process to run everything in one process.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from benchmarks.fixtures import (
+    CONTRACT_PDF,
+    ROOT_DIR,
+    configure_environment,
+    git_commit,
+    gurbani_resources,
+    synthetic_text,
+    unlimit_gateway,
+)
+
+DEFAULT_OUTPUT = ROOT_DIR / "bench_output.json"
+BENCHMARKS = ("build_index", "retrieve_context", "mmr_rerank", "ask_question", "youtube_answer", "legal_analyze",
+              "netzero_graph", "netzero_scenarios")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a non-empty list."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(name: str, fn: Callable[[], object], iterations: int, warmup: int = 1,
+            units: int = 1, unit: str = "op", **params) -> dict:
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - start
+    result = {
+        "name": name,
+        "params": params,
+        "iterations": iterations,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "throughput_per_s": round(iterations * units / total, 3),
+        "throughput_unit": unit,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    print(f"{name:<28} p50={result['p50_ms']:>9.2f}ms p95={result['p95_ms']:>9.2f}ms "
+          f"p99={result['p99_ms']:>9.2f}ms {result['throughput_per_s']:>9.1f} {unit}/s "
+          f"rss={result['peak_rss_mb']}MB {params or ''}")
+    return result
+
+
+# ---------------- benchmarks ----------------
+def bench_build_index(args, workdir: Path) -> List[dict]:
+    from Gurbani_OCR_RAG import build_index as bi
+
+    data_dir = workdir / "gurbani"
+    data_dir.mkdir(exist_ok=True)
+    (data_dir / "Gurbani.txt").write_text(synthetic_text(args.index_words), encoding="utf-8")
+    bi.DATA_DIR, bi.STORE_DIR, bi.CHUNKS_PATH = data_dir, data_dir / "store", data_dir / "chunks.json"
+    n_chunks = len(bi.chunk_text(bi.load_source_text()))
+    return [
+        measure("build_index", bi.build_index, args.iterations_slow, warmup=0,
+                units=n_chunks, unit="chunk", chunks=n_chunks),
+        measure("build_index_local", lambda: bi.build_index(provider="local"), args.iterations_slow,
+                warmup=0, units=n_chunks, unit="chunk", chunks=n_chunks),
+    ]
+
+
+def bench_retrieve_context(args, workdir: Path) -> List[dict]:
+    import numpy as np
+    from openai import OpenAI
+    from Gurbani_OCR_RAG import ask
+    from benchmarks.stub_openai import EMBEDDING_DIMS
+    from common.vector_store import VectorStore
+
+    client = OpenAI()
+    dim = EMBEDDING_DIMS[ask.EMBEDDING_MODEL]
+    rng = np.random.default_rng(0)
+    results = []
+    for size in args.corpus_sizes:
+        store = VectorStore(dim, index_type="flat")
+        store.add(rng.standard_normal((size, dim)).astype("float32"),
+                  {"id": list(range(1, size + 1)), "text": [f"chunk {i + 1}" for i in range(size)]})
+        results.append(measure(
+            "retrieve_context",
+            lambda: ask.retrieve_context(client, store, "What life lesson is highlighted?"),
+            args.iterations, corpus_size=size, dim=dim,
+        ))
+    return results
+
+
+def bench_mmr_rerank(args, workdir: Path) -> List[dict]:
+    """MMR re-ranking cost alone (the search itself is covered by retrieve_context)."""
+    import numpy as np
+    from Gurbani_OCR_RAG import ask
+    from benchmarks.stub_openai import EMBEDDING_DIMS
+    from common.rerank import mmr_select
+
+    dim = EMBEDDING_DIMS[ask.EMBEDDING_MODEL]
+    rng = np.random.default_rng(0)
+    results = []
+    for fetch_k in (ask.FETCH_K, 50, 100):
+        candidates = rng.standard_normal((fetch_k, dim)).astype("float32")
+        candidates /= np.linalg.norm(candidates, axis=1, keepdims=True)
+        query = candidates[0] + 0.1 * rng.standard_normal(dim).astype("float32")
+        results.append(measure("mmr_rerank", lambda: mmr_select(query, candidates, ask.TOP_K),
+                               args.iterations * 10, fetch_k=fetch_k, k=ask.TOP_K, dim=dim))
+    return results
+
+
+def bench_ask_question(args, workdir: Path) -> List[dict]:
+    from Gurbani_OCR_RAG import ask
+
+    client, store = gurbani_resources(args, workdir)
+    return [measure("ask_question", lambda: ask.ask_question("What does ਗੁਰੂ teach?", client, store),
+                    args.iterations, chunks=len(store))]
+
+
+def bench_youtube_answer(args, workdir: Path) -> List[dict]:
+    from YouTube_RAG import pipeline, transcript_utils
+    from YouTube_RAG.ingest import get_ingestor
+
+    transcript_utils.TRANSCRIPT_CACHE_DIR = workdir / "transcripts"
+    transcript_utils.TRANSCRIPT_CACHE_DIR.mkdir(exist_ok=True)
+    video_id = "benchvideo0"
+    (transcript_utils.TRANSCRIPT_CACHE_DIR / f"{video_id}.txt").write_text(
+        synthetic_text(args.transcript_words), encoding="utf-8"
+    )
+    url = f"https://www.youtube.com/watch?v={video_id}"
+
+    def run(cold: bool):
+        if cold:
+            get_ingestor().clear()
+        result = pipeline.answer_question(url, "What is the video about?")
+        if result["answer"].startswith("Error:"):
+            raise RuntimeError(result["answer"])
+
+    return [
+        measure("youtube_answer_question", lambda: run(True), args.iterations_slow, words=args.transcript_words),
+        # Ingestion already started (and finished) when the URL was entered: only the question remains
+        measure("youtube_answer_after_ingest", lambda: run(False), args.iterations, words=args.transcript_words),
+    ]
+
+
+def bench_legal_analyze(args, workdir: Path) -> List[dict]:
+    from Legal_Doc_Analyzer import parser, pipeline, store
+
+    store.CONTRACT_STORE_DIR = workdir / "contracts"
+
+    def parse():
+        with CONTRACT_PDF.open("rb") as fh:
+            parser.extract_text_from_pdf(fh)
+
+    def analyze():
+        with CONTRACT_PDF.open("rb") as fh:
+            answer = pipeline.analyze_contract(fh, "What is the termination notice period?")
+        if answer.startswith("Error:"):
+            raise RuntimeError(answer)
+
+    return [
+        measure("legal_parse", parse, args.iterations),
+        measure("legal_parse_and_answer", analyze, args.iterations),
+    ]
+
+
+def bench_netzero_graph(args, workdir: Path) -> List[dict]:
+    import io
+    from NetZero_Advisor.graph import get_graph
+    from NetZero_Advisor.memo import get_checkpointer
+    from NetZero_Advisor.payload import release_payload, spool_upload
+
+    report = ("site,month,energy_kwh,fuel\n" + "\n".join(
+        f"site{i % 7},{i % 12},{i * 13 % 997},energy" for i in range(args.netzero_rows)
+    )).encode("utf-8")
+    graph = get_graph()
+
+    def run(cold: bool):
+        if cold:
+            get_checkpointer().clear()
+        payload = spool_upload(io.BytesIO(report), name="bench.csv")
+        try:
+            result = graph.invoke({"payload": payload, "goal": "Generate a NetZero roadmap"})
+        finally:
+            release_payload(payload)
+        if "plan" not in result:
+            raise RuntimeError("NetZero graph produced no plan")
+
+    return [
+        measure("netzero_graph_cold", lambda: run(True), args.iterations_slow, rows=args.netzero_rows,
+                bytes=len(report)),
+        measure("netzero_graph_memoized", lambda: run(False), args.iterations, rows=args.netzero_rows),
+    ]
+
+
+def bench_netzero_scenarios(args, workdir: Path) -> List[dict]:
+    """Monte Carlo pathway sweep alone (pathways x uncertainty draws x years)."""
+    from NetZero_Advisor.scenarios import simulate
+
+    return [measure("netzero_scenarios", lambda: simulate(1000.0, years=30, scenarios=n), args.iterations,
+                    units=n, unit="scenario", scenarios=n, years=30) for n in (10_000, 100_000)]
+
+
+RUNNERS: Dict[str, Callable] = {
+    "build_index": bench_build_index,
+    "retrieve_context": bench_retrieve_context,
+    "mmr_rerank": bench_mmr_rerank,
+    "ask_question": bench_ask_question,
+    "youtube_answer": bench_youtube_answer,
+    "legal_analyze": bench_legal_analyze,
+    "netzero_graph": bench_netzero_graph,
+    "netzero_scenarios": bench_netzero_scenarios,
+}
+
+
+# ---------------- driver ----------------
+def _run_in_process(names: List[str], args, stub_url: str) -> List[dict]:
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        workdir = Path(tmp)
+        configure_environment(stub_url, workdir)
+        unlimit_gateway()
+        results = []
+        for name in names:
+            try:
+                results.extend(RUNNERS[name](args, workdir))
+            except Exception as e:
+                print(f"{name} failed: {e}", file=sys.stderr)
+                results.append({"name": name, "error": f"{type(e).__name__}: {e}"})
+        return results
+
+
+def _run_isolated(name: str, argv: List[str], stub_url: str) -> List[dict]:
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as fh:
+        out = Path(fh.name)
+    try:
+        cmd = [sys.executable, "-m", "benchmarks.run", *argv, "--only", name,
+               "--stub-url", stub_url, "--worker-output", str(out)]
+        proc = subprocess.run(cmd, cwd=ROOT_DIR)
+        if proc.returncode != 0 or not out.read_text():
+            return [{"name": name, "error": f"worker exited with {proc.returncode}"}]
+        return json.loads(out.read_text())
+    finally:
+        out.unlink(missing_ok=True)
+
+
+def compare(current: dict, previous_path: Path) -> None:
+    previous = json.loads(previous_path.read_text(encoding="utf-8"))
+
+    def keyed(report):
+        return {(r["name"], json.dumps(r.get("params", {}), sort_keys=True)): r
+                for r in report["results"] if "error" not in r}
+
+    before = keyed(previous)
+    print(f"\nComparison against {previous_path} ({previous['meta'].get('commit')}):")
+    for key, result in keyed(current).items():
+        old = before.get(key)
+        if not old:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms"):
+            if metric not in result or metric not in old:
+                continue
+            delta = (result[metric] - old[metric]) / old[metric] * 100 if old[metric] else 0.0
+            print(f"  {key[0]:<28} {metric:<7} {old[metric]:>9.2f} -> {result[metric]:>9.2f} ({delta:+.1f}%)")
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite against a stub OpenAI API.")
+    parser.add_argument("--only", action="append", choices=BENCHMARKS, help="Benchmark to run (repeatable).")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="Where to write the JSON report.")
+    parser.add_argument("--compare", type=Path, help="Previous report to diff against.")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--iterations-slow", type=int, default=5, help="Iterations for whole-pipeline builds.")
+    parser.add_argument("--corpus-sizes", type=lambda s: [int(x) for x in s.split(",")], default=[1000, 5000, 20000])
+    parser.add_argument("--index-words", type=int, default=15000)
+    parser.add_argument("--transcript-words", type=int, default=8000)
+    parser.add_argument("--netzero-rows", type=int, default=20000)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Stub latency per embeddings call (s).")
+    parser.add_argument("--chat-latency", type=float, default=0.0, help="Stub latency per chat call (s).")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0,
+                        help="Stub latency per 1k uncached prompt tokens (ms); cached prefixes skip it.")
+    parser.add_argument("--in-process", action="store_true", help="Run all benchmarks in this process.")
+    parser.add_argument("--stub-url", help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", type=Path, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def _worker_argv(args) -> List[str]:
+    return [
+        "--iterations", str(args.iterations),
+        "--iterations-slow", str(args.iterations_slow),
+        "--corpus-sizes", ",".join(str(size) for size in args.corpus_sizes),
+        "--index-words", str(args.index_words),
+        "--transcript-words", str(args.transcript_words),
+        "--netzero-rows", str(args.netzero_rows),
+    ]
+
+
+def main(argv=None) -> None:
+    args = _parse_args(argv)
+    names = args.only or list(BENCHMARKS)
+
+    if args.worker_output:
+        results = _run_in_process(names, args, args.stub_url)
+        args.worker_output.write_text(json.dumps(results), encoding="utf-8")
+        return
+
+    from benchmarks.stub_openai import StubConfig, StubServer
+
+    passthrough = _worker_argv(args)
+    with StubServer(config=StubConfig(args.embed_latency, args.chat_latency,
+                                      prefill_ms_per_1k=args.prefill_ms_per_1k)) as stub:
+        if args.in_process:
+            results = _run_in_process(names, args, stub.base_url)
+        else:
+            results = [r for name in names for r in _run_isolated(name, passthrough, stub.base_url)]
+        stub_requests = stub.config.requests
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "stub": {"embed_latency": args.embed_latency, "chat_latency": args.chat_latency,
+                     "prefill_ms_per_1k": args.prefill_ms_per_1k, "requests": stub_requests},
+        },
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nWrote {len(results)} results to {args.output}")
+    if args.compare:
+        compare(report, args.compare)
+    if any("error" in r for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
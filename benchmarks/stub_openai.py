@@ -0,0 +1,225 @@
+"""Deterministic local stand-in for the OpenAI embeddings and chat-completions API.
+
+    python -m benchmarks.stub_openai --port 8765 --chat-latency 0.2
+
+Point clients at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1. Embeddings
+are pseudo-random unit vectors seeded by a hash of the input text, so the same
+text always maps to the same vector; chat answers are derived from the prompt.
+
+Chat calls emulate provider prompt caching: a prompt prefix already seen (from
+1024 tokens, in 128-token steps) is reported in
+usage.prompt_tokens_details.cached_tokens, and only uncached tokens pay the
+optional --prefill-ms-per-1k latency before the first token.
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import numpy as np
+
+EMBEDDING_DIMS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+}
+DEFAULT_DIM = 1536
+
+
+def pseudo_embedding(text: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dim).astype("float32")
+    return vector / np.linalg.norm(vector)
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# Prompt caching granularity, in characters (4 per token): 1024-token minimum, 128-token steps.
+CACHE_MIN_CHARS = 1024 * 4
+CACHE_STEP_CHARS = 128 * 4
+
+
+class StubConfig:
+    def __init__(self, embed_latency: float = 0.0, chat_latency: float = 0.0, stream_chunks: int = 8,
+                 prefill_ms_per_1k: float = 0.0):
+        self.embed_latency = embed_latency
+        self.chat_latency = chat_latency
+        self.stream_chunks = stream_chunks
+        self.prefill_ms_per_1k = prefill_ms_per_1k
+        self.requests = 0
+        self._prefixes: set = set()
+        self._lock = threading.Lock()
+
+    def cached_chars(self, prompt: str) -> int:
+        """Length of the longest previously seen cacheable prefix; remembers this prompt's prefixes."""
+        digests = [(end, hashlib.sha256(prompt[:end].encode("utf-8")).digest())
+                   for end in range(CACHE_MIN_CHARS, len(prompt) + 1, CACHE_STEP_CHARS)]
+        with self._lock:
+            cached = max((end for end, digest in digests if digest in self._prefixes), default=0)
+            self._prefixes.update(digest for _, digest in digests)
+        return cached
+
+
+def _make_handler(config: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):  # keep benchmark output clean
+            pass
+
+        def _send_json(self, payload: dict, status: int = 200) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            config.requests += 1
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            path = self.path.rstrip("/")
+            if path.endswith("/embeddings"):
+                self._embeddings(request)
+            elif path.endswith("/chat/completions"):
+                self._chat(request)
+            else:
+                self._send_json({"error": {"message": f"Unknown route {self.path}"}}, status=404)
+
+        def _embeddings(self, request: dict) -> None:
+            time.sleep(config.embed_latency)
+            inputs = request.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            model = request.get("model", "")
+            dim = request.get("dimensions") or EMBEDDING_DIMS.get(model, DEFAULT_DIM)
+            data = [
+                {"object": "embedding", "index": i, "embedding": pseudo_embedding(text, dim).tolist()}
+                for i, text in enumerate(inputs)
+            ]
+            prompt_tokens = sum(_tokens(text) for text in inputs)
+            self._send_json({
+                "object": "list",
+                "data": data,
+                "model": model,
+                "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
+            })
+
+        def _chat(self, request: dict) -> None:
+            messages = request.get("messages", [])
+            prompt = json.dumps(messages, ensure_ascii=False)
+            cached = config.cached_chars(prompt)
+            uncached_tokens = _tokens(prompt[cached:]) if cached < len(prompt) else 0
+            time.sleep(config.chat_latency + config.prefill_ms_per_1k * uncached_tokens / 1_000_000)
+            digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+            question = next(
+                (str(m.get("content", "")) for m in reversed(messages) if m.get("role") == "user"), ""
+            )
+            answer = f"Stub answer {digest}: {question[-80:].strip()}"
+            usage = {
+                "prompt_tokens": _tokens(prompt),
+                "completion_tokens": _tokens(answer),
+                "total_tokens": _tokens(prompt) + _tokens(answer),
+                "prompt_tokens_details": {"cached_tokens": cached // 4},
+            }
+            base = {
+                "id": f"chatcmpl-{digest}",
+                "created": int(time.time()),
+                "model": request.get("model", ""),
+            }
+            if request.get("stream"):
+                self._stream(base, answer, usage)
+                return
+            self._send_json({
+                **base,
+                "object": "chat.completion",
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": answer},
+                }],
+                "usage": usage,
+            })
+
+        def _stream(self, base: dict, answer: str, usage: dict) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            step = max(1, len(answer) // config.stream_chunks)
+            pieces = [answer[i:i + step] for i in range(0, len(answer), step)]
+            for i, piece in enumerate(pieces):
+                chunk = {
+                    **base,
+                    "object": "chat.completion.chunk",
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": piece} if i == 0 else {"content": piece},
+                        "finish_reason": None,
+                    }],
+                }
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            final = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(final)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            self.close_connection = True
+
+    return Handler
+
+
+class StubServer:
+    """Runs the stub on a background thread; use as a context manager."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[StubConfig] = None):
+        self.config = config or StubConfig()
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self.config))
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a deterministic stub of the OpenAI API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds added to each embeddings call.")
+    parser.add_argument("--chat-latency", type=float, default=0.0, help="Seconds added to each chat call.")
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=0.0,
+                        help="Milliseconds per 1k uncached prompt tokens added before the first token.")
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port,
+                        StubConfig(args.embed_latency, args.chat_latency, prefill_ms_per_1k=args.prefill_ms_per_1k))
+    print(f"Stub OpenAI API on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
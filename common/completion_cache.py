@@ -0,0 +1,117 @@
+"""Disk-backed exact-match cache for deterministic chat completions.
+
+Entries are keyed by the gateway's canonical request hash (model, messages,
+temperature and every other parameter), live in SQLite, and are evicted by
+TTL and by total size (least recently used first). Modules opt in per call
+with a namespace, which is also the unit hit ratios are reported by.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Optional
+
+from common.logger import get_logger
+from common.metrics import record_cache
+
+logger = get_logger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", ROOT_DIR / ".cache" / "completions.sqlite3"))
+TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+# Set LLM_CACHE_BYPASS=1 to skip the cache process-wide (reads and writes).
+BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in {"1", "true", "yes"}
+
+
+class CompletionCache:
+    def __init__(self, path: Path = CACHE_PATH, ttl: float = TTL_SECONDS, max_bytes: int = MAX_BYTES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits: Dict[str, int] = defaultdict(int)
+        self.misses: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " key TEXT PRIMARY KEY, namespace TEXT NOT NULL, response TEXT NOT NULL,"
+                " size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON completions (accessed)")
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                row = None
+            if row:
+                self._conn.execute("UPDATE completions SET accessed = ? WHERE key = ?", (now, key))
+                self.hits[namespace] += 1
+                record_cache("completion", namespace, hit=True)
+                return row[0]
+            self.misses[namespace] += 1
+            record_cache("completion", namespace, hit=False)
+            return None
+
+    def put(self, namespace: str, key: str, response: str) -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?)",
+                (key, namespace, response, len(response), now, now),
+            )
+            self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM completions WHERE created < ?", (now - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute("SELECT key, size FROM completions ORDER BY accessed"):
+            stale.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        self._conn.executemany("DELETE FROM completions WHERE key = ?", stale)
+        logger.info("Completion cache evicted %s entries (%s bytes)", len(stale), freed)
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM completions")
+
+    def stats(self) -> Dict[str, dict]:
+        """Hit/miss counts and hit ratio per namespace since process start."""
+        with self._lock:
+            namespaces = set(self.hits) | set(self.misses)
+            return {
+                ns: {
+                    "hits": self.hits[ns],
+                    "misses": self.misses[ns],
+                    "hit_ratio": round(self.hits[ns] / max(1, self.hits[ns] + self.misses[ns]), 4),
+                }
+                for ns in sorted(namespaces)
+            }
+
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> CompletionCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CompletionCache()
+        return _cache
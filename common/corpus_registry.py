@@ -0,0 +1,109 @@
+"""Serves many vector-store corpora from one process.
+
+Corpora are discovered as subdirectories of a root that contain a saved
+VectorStore (`manifest.json`), plus any explicitly registered paths. Each
+corpus is loaded on its first query and kept in an LRU bounded by an estimated
+resident size (CORPUS_CACHE_MB); cold corpora are evicted when the budget is
+exceeded. Concurrent first queries for the same corpus share one load.
+"""
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from common.exceptions import VectorStoreError
+from common.logger import get_logger
+from common.metrics import record_cache
+from common.vector_store import MANIFEST, VectorStore
+
+logger = get_logger(__name__)
+
+MAX_BYTES = int(float(os.getenv("CORPUS_CACHE_MB", "1024")) * 1024 * 1024)
+
+
+class CorpusRegistry:
+    def __init__(self, root: Optional[Path] = None, paths: Optional[Dict[str, Path]] = None,
+                 max_bytes: int = MAX_BYTES):
+        self.root = Path(root) if root else None
+        self.max_bytes = max_bytes
+        self._paths: Dict[str, Path] = {name: Path(path) for name, path in (paths or {}).items()}
+        self._resident: "OrderedDict[str, tuple]" = OrderedDict()  # name -> (store, bytes)
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.evictions = 0
+
+    def discover(self) -> Dict[str, Path]:
+        """Rescans the root; explicitly registered paths take precedence."""
+        found: Dict[str, Path] = {}
+        if self.root and self.root.is_dir():
+            for manifest in sorted(self.root.glob(f"*/{MANIFEST}")):
+                found[manifest.parent.name] = manifest.parent
+        found.update(self._paths)
+        return found
+
+    def names(self) -> List[str]:
+        return sorted(self.discover())
+
+    def register(self, name: str, path: Path, store: Optional[VectorStore] = None) -> None:
+        """Adds a corpus by path; pass an already loaded store to make it resident immediately."""
+        with self._lock:
+            self._paths[name] = Path(path)
+            if store is not None:
+                self._admit(name, store)
+
+    def get(self, name: str) -> VectorStore:
+        with self._lock:
+            entry = self._resident.get(name)
+            if entry is not None:
+                self._resident.move_to_end(name)
+                record_cache("corpus", name, hit=True)
+                return entry[0]
+            future = self._loading.get(name)
+            leader = future is None
+            if leader:
+                future = self._loading[name] = Future()
+        if not leader:
+            return future.result()
+
+        record_cache("corpus", name, hit=False)
+        try:
+            path = self.discover().get(name)
+            if path is None:
+                raise VectorStoreError(f"Unknown corpus {name!r}.")
+            store = VectorStore.load(path)
+        except BaseException as e:
+            with self._lock:
+                self._loading.pop(name, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            self._loading.pop(name, None)
+            self.loads += 1
+            self._admit(name, store)
+        future.set_result(store)
+        return store
+
+    def _admit(self, name: str, store: VectorStore) -> None:
+        """Makes a store resident and evicts least recently used ones over budget. Caller holds the lock."""
+        self._resident[name] = (store, store.memory_bytes())
+        self._resident.move_to_end(name)
+        while len(self._resident) > 1 and self.resident_bytes() > self.max_bytes:
+            evicted, (_, size) = self._resident.popitem(last=False)
+            self.evictions += 1
+            logger.info("Evicted corpus %s (%.1f MB) from memory", evicted, size / 1e6)
+
+    def resident_bytes(self) -> int:
+        return sum(size for _, size in self._resident.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "resident": list(self._resident),
+                "resident_mb": round(self.resident_bytes() / 1e6, 1),
+                "max_mb": round(self.max_bytes / 1e6, 1),
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
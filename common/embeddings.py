@@ -0,0 +1,244 @@
+"""Embedding providers: the OpenAI API (through the gateway) or a CPU-local backend.
+
+`LocalEmbeddings` needs no network. It hashes character n-grams of each text
+into HASH_FEATURES buckets, weights them by sublinear TF x IDF, and projects the
+sparse vector to `dim` with a fixed sparse random projection (each bucket adds
+±1 to PROJECTION_NNZ output dimensions). The whole batch is processed as
+NumPy arrays: no per-n-gram Python work. IDF comes from `fit` on the indexed
+corpus and is saved next to the store, so queries are weighted the same way.
+
+A store records the provider that built it (`VectorStore.embedding`, kept in
+its manifest); `provider_for_store` rebuilds the matching provider for queries
+and fails fast when the configured provider is a different one.
+
+Environment:
+    EMBEDDING_PROVIDER   openai (default) | local
+    LOCAL_EMBEDDING_DIM  output dimension of the local provider (default 768)
+"""
+import abc
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
+
+from common.exceptions import EmbeddingMismatchError, VectorStoreError
+from common.llm_gateway import get_gateway
+
+if TYPE_CHECKING:
+    import numpy as np
+
+PROVIDER = os.getenv("EMBEDDING_PROVIDER", "openai").lower()
+LOCAL_DIM = int(os.getenv("LOCAL_EMBEDDING_DIM", "768"))
+OPENAI_BATCH = 256
+
+HASH_FEATURES = 1 << 18
+NGRAM_RANGE = (3, 5)
+PROJECTION_NNZ = 2
+# Texts vectorised together; bounds the size of the temporary n-gram arrays
+LOCAL_BATCH = 256
+IDF_FILE = "embedding_idf.npy"
+# Loaded local providers kept for queries (each holds its projection and IDF tables, ~5 MB)
+LOCAL_PROVIDER_CACHE = 4
+
+
+class EmbeddingProvider(abc.ABC):
+    """Turns texts into float32 row vectors; `info()` identifies the vector space."""
+
+    name = ""
+
+    def __init__(self, model: str, dim: Optional[int] = None):
+        self.model = model
+        self.dim = dim
+
+    @abc.abstractmethod
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        """One row per text, in order."""
+
+    def embed_query(self, text: str) -> "np.ndarray":
+        return self.embed([text])[0]
+
+    def fit(self, texts: Sequence[str]) -> None:
+        """Learns corpus statistics before indexing; stateless providers ignore it."""
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Writes learned state next to a saved store."""
+
+    def info(self) -> dict:
+        return {"provider": self.name, "model": self.model, "dim": self.dim}
+
+
+class OpenAIEmbeddings(EmbeddingProvider):
+    name = "openai"
+
+    def __init__(self, model: str, client=None, lab: str = "unknown", batch_size: int = OPENAI_BATCH):
+        super().__init__(model)
+        self.client = client
+        self.lab = lab
+        self.batch_size = batch_size
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        import numpy as np
+
+        vectors: List[list] = []
+        for start in range(0, len(texts), self.batch_size):
+            resp = get_gateway().embed(self.model, list(texts[start:start + self.batch_size]),
+                                       client=self.client, lab=self.lab)
+            vectors.extend(item.embedding for item in sorted(resp.data, key=lambda item: item.index))
+        matrix = np.asarray(vectors, dtype="float32")
+        if len(matrix):
+            self.dim = matrix.shape[1]
+        return matrix
+
+
+def _mix(h: "np.ndarray") -> "np.ndarray":
+    """splitmix64 finaliser over a uint64 array (wrapping arithmetic)."""
+    import numpy as np
+
+    h = h ^ (h >> np.uint64(30))
+    h = h * np.uint64(0xBF58476D1CE4E5B9)
+    h = h ^ (h >> np.uint64(27))
+    h = h * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+class LocalEmbeddings(EmbeddingProvider):
+    name = "local"
+
+    def __init__(self, dim: int = LOCAL_DIM, seed: int = 0):
+        super().__init__(f"hashed-tfidf-char{NGRAM_RANGE[0]}-{NGRAM_RANGE[1]}-d{dim}-s{seed}", dim)
+        import numpy as np
+
+        self.seed = seed
+        self.idf: Optional["np.ndarray"] = None
+        rng = np.random.default_rng(seed)
+        self._buckets = rng.integers(0, dim, size=(HASH_FEATURES, PROJECTION_NNZ), dtype=np.int32)
+        self._signs = (rng.integers(0, 2, size=(HASH_FEATURES, PROJECTION_NNZ)) * 2 - 1).astype("float32")
+
+    def _features(self, texts: Sequence[str]) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """Unique (doc, feature, count) triples of the hashed character n-grams of `texts`."""
+        import numpy as np
+
+        normalised = [f" {' '.join(text.lower().split())} " for text in texts]
+        codes = np.frombuffer("".join(normalised).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        lengths = np.fromiter((len(text) for text in normalised), dtype=np.int64, count=len(normalised))
+        doc_of = np.repeat(np.arange(len(normalised), dtype=np.int64), lengths)
+        docs, feats = [], []
+        # Polynomial hash of the n-gram starting at each position, extended one character per n
+        h = codes.copy()
+        for n in range(2, NGRAM_RANGE[1] + 1):
+            starts = len(codes) - n + 1
+            if starts <= 0:
+                break
+            h = h[:starts] * np.uint64(1_000_003) + codes[n - 1:]
+            if n < NGRAM_RANGE[0]:
+                continue
+            same_doc = doc_of[:starts] == doc_of[n - 1:]
+            docs.append(doc_of[:starts][same_doc])
+            feats.append((_mix(h[same_doc]) % np.uint64(HASH_FEATURES)).astype(np.int64))
+        if not docs:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        keys, counts = np.unique(np.concatenate(docs) * HASH_FEATURES + np.concatenate(feats), return_counts=True)
+        return keys // HASH_FEATURES, keys % HASH_FEATURES, counts
+
+    def fit(self, texts: Sequence[str]) -> None:
+        """Smoothed IDF per hashed feature over `texts` (the corpus being indexed)."""
+        import numpy as np
+
+        df = np.zeros(HASH_FEATURES, dtype=np.int64)
+        for start in range(0, len(texts), LOCAL_BATCH):
+            _, feats, _ = self._features(texts[start:start + LOCAL_BATCH])
+            df += np.bincount(feats, minlength=HASH_FEATURES)
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype("float32")
+
+    def embed(self, texts: Sequence[str]) -> "np.ndarray":
+        import numpy as np
+
+        if len(texts) > LOCAL_BATCH:
+            return np.vstack([self.embed(texts[start:start + LOCAL_BATCH])
+                              for start in range(0, len(texts), LOCAL_BATCH)])
+        docs, feats, counts = self._features(texts)
+        weights = (1 + np.log(counts)).astype("float32")
+        if self.idf is not None:
+            weights *= self.idf[feats]
+        rows = np.repeat(docs, PROJECTION_NNZ) * self.dim + self._buckets[feats].ravel()
+        values = (weights[:, None] * self._signs[feats]).ravel()
+        matrix = np.bincount(rows, weights=values, minlength=len(texts) * self.dim)
+        matrix = matrix.reshape(len(texts), self.dim).astype("float32")
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def save(self, path: Union[str, Path]) -> None:
+        import numpy as np
+
+        if self.idf is not None:
+            np.save(Path(path) / IDF_FILE, self.idf)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], dim: int = LOCAL_DIM, seed: int = 0) -> "LocalEmbeddings":
+        import numpy as np
+
+        provider = cls(dim, seed)
+        idf_path = Path(path) / IDF_FILE
+        if idf_path.exists():
+            provider.idf = np.load(idf_path)
+        return provider
+
+    def info(self) -> dict:
+        return {**super().info(), "seed": self.seed}
+
+
+def get_provider(model: str, client=None, lab: str = "unknown", provider: Optional[str] = None) -> EmbeddingProvider:
+    """The configured provider (EMBEDDING_PROVIDER); `model` is the OpenAI model a lab would use."""
+    provider = (provider or PROVIDER).lower()
+    if provider == OpenAIEmbeddings.name:
+        return OpenAIEmbeddings(model, client=client, lab=lab)
+    if provider == LocalEmbeddings.name:
+        return LocalEmbeddings()
+    raise VectorStoreError(f"Unknown embedding provider {provider!r}; expected openai or local.")
+
+
+# (store files path, model, IDF mtime) -> loaded local provider, so IDF tables are read once per corpus build.
+# An LRU of LOCAL_PROVIDER_CACHE entries: every rebuild publishes a new generation, i.e. a new key.
+_local_providers: "OrderedDict[tuple, LocalEmbeddings]" = OrderedDict()
+_local_providers_lock = threading.Lock()
+
+
+def provider_for_store(store, client=None, lab: str = "unknown", provider: Optional[str] = None,
+                       default_model: Optional[str] = None) -> EmbeddingProvider:
+    """Query-side provider matching the vector space a store was built in.
+
+    Raises EmbeddingMismatchError when the configured provider differs from the
+    one recorded in the store's manifest. Stores saved without that record were
+    built with OpenAI (`default_model`).
+    """
+    provider = (provider or PROVIDER).lower()
+    built = store.embedding or {"provider": OpenAIEmbeddings.name, "model": default_model}
+    if built["provider"] != provider:
+        raise EmbeddingMismatchError(
+            f"Store {store.path or ''} was built with {built['provider']} embeddings ({built.get('model')}), "
+            f"but EMBEDDING_PROVIDER is {provider}; rebuild the index or change the provider."
+        )
+    if built.get("dim") and built["dim"] != store.dim:
+        raise EmbeddingMismatchError(f"Store dimension {store.dim} does not match its embedding {built}.")
+    if provider == OpenAIEmbeddings.name:
+        return OpenAIEmbeddings(built.get("model") or default_model, client=client, lab=lab)
+    # The IDF table is saved with the store's files, i.e. in its published generation
+    files = store.data_path
+    idf_path = Path(files) / IDF_FILE if files else None
+    key = (str(files), built["model"], idf_path.stat().st_mtime_ns if idf_path and idf_path.exists() else 0)
+    with _local_providers_lock:
+        cached = _local_providers.get(key)
+        if cached is not None:
+            _local_providers.move_to_end(key)
+            return cached
+    dim, seed = built.get("dim") or LOCAL_DIM, built.get("seed", 0)
+    cached = LocalEmbeddings.load(files, dim, seed) if files else LocalEmbeddings(dim, seed)
+    if cached.model != built["model"]:
+        raise EmbeddingMismatchError(f"Local embedding model {cached.model} does not match {built['model']}.")
+    with _local_providers_lock:
+        _local_providers[key] = cached
+        while len(_local_providers) > LOCAL_PROVIDER_CACHE:
+            _local_providers.popitem(last=False)
+    return cached
@@ -46,4 +46,14 @@ class ContractParseError(BaseAIError):
 
 class ContractAnalysisError(BaseAIError):
     """Raised when LLM fails to analyze a contract."""
-    pass
\ No newline at end of file
+    pass
+
+# ----------------- Shared retrieval -----------------
+class VectorStoreError(RAGException):
+    """Raised when a vector store cannot be built, searched or loaded."""
+    pass
+
+
+class EmbeddingMismatchError(VectorStoreError):
+    """Raised when a store is queried with a different embedding provider or model than it was built with."""
+    pass
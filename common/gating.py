@@ -0,0 +1,112 @@
+"""Retrieval-confidence gating: skip the completion when nothing relevant was retrieved.
+
+Each corpus (a saved VectorStore directory, or a lab directory for ad-hoc
+corpora such as YouTube transcripts) may carry a `gating.json` with a
+similarity threshold calibrated offline from a labelled question set (see
+`calibrate`). When the best retrieval score of a question falls below it, the
+pipeline answers with its refusal directly, so off-topic traffic costs one
+embedding and one search instead of a chat completion.
+
+Labelled question sets are JSON lines: {"question": "...", "answerable": true}.
+
+Environment:
+    GATING_TARGET_RECALL  share of answerable questions that must pass (default 0.95)
+    GATING_DISABLED       set to 1 to ignore calibrated thresholds
+"""
+import json
+import math
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+from common.exceptions import VectorStoreError
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+GATING_FILE = "gating.json"
+TARGET_RECALL = float(os.getenv("GATING_TARGET_RECALL", "0.95"))
+DISABLED = os.getenv("GATING_DISABLED", "").lower() in {"1", "true", "yes"}
+
+# path -> (mtime_ns, calibration); re-read when the file is recalibrated
+_calibrations: Dict[str, tuple] = {}
+
+
+def read_questions(path: Union[str, Path]) -> List[dict]:
+    questions = []
+    for line in Path(path).read_text(encoding="utf-8").splitlines():
+        if line.strip():
+            record = json.loads(line)
+            questions.append({**record, "question": record["question"], "answerable": bool(record["answerable"])})
+    return questions
+
+
+def calibrate(answerable: Sequence[float], unanswerable: Sequence[float],
+              target_recall: float = TARGET_RECALL) -> dict:
+    """Picks the highest top-1 score threshold that still passes `target_recall` of answerable questions.
+
+    Both arguments are best retrieval scores per labelled question. The result
+    also reports how much off-topic traffic the threshold would refuse.
+    """
+    if not answerable:
+        raise VectorStoreError("Calibration needs at least one answerable question.")
+    passing = sorted(answerable)
+    threshold = passing[min(len(passing) - 1, int(math.floor((1 - target_recall) * len(passing))))]
+    refused = sum(score < threshold for score in unanswerable)
+    return {
+        "threshold": float(threshold),
+        "target_recall": target_recall,
+        "answerable_recall": sum(score >= threshold for score in answerable) / len(answerable),
+        "unanswerable_refused": refused / len(unanswerable) if unanswerable else None,
+        "answerable": len(answerable),
+        "unanswerable": len(unanswerable),
+    }
+
+
+def calibrate_questions(questions: Iterable[dict], top_score: Callable[[dict], float],
+                        target_recall: float = TARGET_RECALL) -> dict:
+    """Scores each labelled question with `top_score` (best retrieval similarity) and calibrates."""
+    answerable, unanswerable = [], []
+    for record in questions:
+        (answerable if record["answerable"] else unanswerable).append(float(top_score(record)))
+    return calibrate(answerable, unanswerable, target_recall)
+
+
+def save_calibration(directory: Union[str, Path], calibration: dict, **info) -> Path:
+    path = Path(directory) / GATING_FILE
+    path.write_text(json.dumps({**calibration, **info, "calibrated_at": time.time()}, indent=2), encoding="utf-8")
+    logger.info("Saved gating threshold %.4f to %s", calibration["threshold"], path)
+    return path
+
+
+def load_threshold(directory: Optional[Union[str, Path]], embedding: Optional[dict] = None) -> Optional[float]:
+    """Calibrated threshold for a corpus directory, or None when it has none (no gating).
+
+    A threshold calibrated for different embeddings than `embedding` (a store's
+    provider info) does not apply and is ignored.
+    """
+    if DISABLED or directory is None:
+        return None
+    path = Path(directory) / GATING_FILE
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _calibrations.get(str(path))
+    if cached is None or cached[0] != mtime:
+        cached = _calibrations[str(path)] = (mtime, json.loads(path.read_text(encoding="utf-8")))
+    calibration = cached[1]
+    calibrated_for = calibration.get("embedding")
+    if embedding and calibrated_for and calibrated_for != embedding:
+        logger.warning("Ignoring %s: calibrated for %s embeddings, store uses %s",
+                       path, calibrated_for.get("model"), embedding.get("model"))
+        return None
+    return float(calibration["threshold"])
+
+
+def is_confident(scores: Iterable[float], threshold: Optional[float]) -> bool:
+    """True when the best score reaches the threshold (always, without one)."""
+    if threshold is None:
+        return True
+    return max(scores, default=-math.inf) >= threshold
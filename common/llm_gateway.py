@@ -0,0 +1,308 @@
+"""Shared gateway for OpenAI calls.
+
+Every lab routes completions (and embeddings) through one process-wide gateway so
+that rate limits are enforced in one place:
+  - token buckets per model for requests/minute and tokens/minute
+  - retries with jittered exponential backoff that honour Retry-After
+  - single-flight coalescing: concurrent identical chat requests share one upstream call
+  - an opt-in persistent exact-match cache for deterministic calls
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from common import completion_cache
+from common.logger import get_logger
+from common.metrics import cached_tokens, record_usage
+from common.telemetry import span
+
+logger = get_logger(__name__)
+
+DEFAULT_RPM = int(os.getenv("LLM_DEFAULT_RPM", "500"))
+DEFAULT_TPM = int(os.getenv("LLM_DEFAULT_TPM", "200000"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+# Completion budget assumed when a request does not set max_tokens.
+DEFAULT_COMPLETION_TOKENS = 512
+
+# (requests/minute, tokens/minute); anything not listed uses the defaults.
+MODEL_LIMITS: Dict[str, Tuple[int, int]] = {
+    "gpt-4o-mini": (DEFAULT_RPM, DEFAULT_TPM),
+    "gpt-4.1-mini": (DEFAULT_RPM, DEFAULT_TPM),
+    "text-embedding-3-small": (3000, 1_000_000),
+    "text-embedding-3-large": (3000, 1_000_000),
+}
+
+_LC_ROLES = {"human": "user", "ai": "assistant", "system": "system", "tool": "tool"}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at capacity/minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Takes `amount` tokens and returns how long the caller must wait for them."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+def to_openai_messages(messages) -> List[dict]:
+    """Converts LangChain messages (or dicts) to OpenAI chat message dicts."""
+    converted = []
+    for message in messages:
+        if isinstance(message, dict):
+            converted.append(message)
+        else:
+            converted.append({"role": _LC_ROLES.get(message.type, "user"), "content": message.content})
+    return converted
+
+
+def request_key(model: str, messages: List[dict], temperature: float, **params) -> str:
+    """Canonical hash of a chat request; equal keys mean interchangeable responses."""
+    blob = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _estimate_tokens(payload, max_tokens: Optional[int] = None) -> int:
+    text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False, default=str)
+    return len(text) // 4 + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    import openai
+
+    if isinstance(exc, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def _backoff(attempt: int, exc: Exception) -> float:
+    delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    retry_after = _retry_after(exc)
+    return max(delay, retry_after) if retry_after is not None else delay
+
+
+class LLMGateway:
+    def __init__(self, api_key: Optional[str] = None, max_retries: int = MAX_RETRIES):
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    # ---------------- clients ----------------
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+
+            # The gateway owns retries, so the SDK's own retry loop is disabled.
+            self._client = OpenAI(api_key=self.api_key or os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return self._client
+
+    def _async_client(self):
+        from openai import AsyncOpenAI
+
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = AsyncOpenAI(api_key=self.api_key or os.getenv("OPENAI_API_KEY"), max_retries=0)
+            self._async_clients[loop] = client
+        return client
+
+    # ---------------- rate limiting ----------------
+    def _bucket(self, model: str, kind: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get((model, kind))
+            if bucket is None:
+                rpm, tpm = MODEL_LIMITS.get(model, (DEFAULT_RPM, DEFAULT_TPM))
+                bucket = TokenBucket(rpm if kind == "requests" else tpm)
+                self._buckets[(model, kind)] = bucket
+            return bucket
+
+    def _reserve(self, model: str, tokens: int) -> float:
+        wait = max(self._bucket(model, "requests").reserve(1), self._bucket(model, "tokens").reserve(tokens))
+        if wait:
+            logger.info("Rate limit: waiting %.2fs for %s", wait, model)
+        return wait
+
+    def set_limits(self, model: str, rpm: int, tpm: int) -> None:
+        MODEL_LIMITS[model] = (rpm, tpm)
+        with self._lock:
+            self._buckets.pop((model, "requests"), None)
+            self._buckets.pop((model, "tokens"), None)
+
+    # ---------------- upstream calls ----------------
+    def _call(self, model: str, tokens: int, fn):
+        time.sleep(self._reserve(model, tokens))
+        for attempt in range(self.max_retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                delay = _backoff(attempt, e)
+                logger.warning("%s call failed (%s); retry %s in %.2fs", model, type(e).__name__, attempt + 1, delay)
+                time.sleep(delay)
+
+    def chat(self, model: str, messages, temperature: float = 0, client=None,
+             cache: Optional[str] = None, bypass_cache: bool = False, lab: Optional[str] = None, **params):
+        """Chat completion with rate limiting, retries and single-flight coalescing.
+
+        Pass `cache="<module>"` to opt into the persistent completion cache
+        (see common.completion_cache); `bypass_cache=True` skips it for one call.
+        `lab` labels telemetry and defaults to the cache namespace.
+        """
+        lab = lab or cache or "unknown"
+        messages = to_openai_messages(messages)
+        key = request_key(model, messages, temperature, **params)
+        store = None
+        if cache and not (bypass_cache or completion_cache.BYPASS):
+            store = completion_cache.get_completion_cache()
+            cached = store.get(cache, key)
+            if cached is not None:
+                from openai.types.chat import ChatCompletion
+
+                logger.debug("Completion cache hit (%s) for %s", cache, model)
+                return ChatCompletion.model_validate_json(cached)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+        if not leader:
+            logger.debug("Coalesced identical %s request onto in-flight call", model)
+            return future.result()
+
+        upstream = client or self.client
+        try:
+            with span("chat_completion", "llm", lab=lab, model=model) as attrs:
+                response = self._call(
+                    model,
+                    _estimate_tokens(messages, params.get("max_tokens")),
+                    lambda: upstream.chat.completions.create(
+                        model=model, messages=messages, temperature=temperature, **params
+                    ),
+                )
+                attrs["cached_tokens"] = cached_tokens(getattr(response, "usage", None))
+            record_usage(lab, model, getattr(response, "usage", None))
+            future.set_result(response)
+            if store is not None:
+                store.put(cache, key, response.model_dump_json())
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def complete(self, model: str, messages, temperature: float = 0, **params) -> str:
+        """Convenience wrapper returning only the first choice's text."""
+        response = self.chat(model, messages, temperature=temperature, **params)
+        return (response.choices[0].message.content or "").strip()
+
+    def embed(self, model: str, texts, client=None, lab: str = "unknown"):
+        """Embeddings request (a string or a list of strings) with rate limiting and retries."""
+        upstream = client or self.client
+        with span("embeddings", "embed", lab=lab, model=model):
+            response = self._call(
+                model,
+                _estimate_tokens(texts, max_tokens=0),
+                lambda: upstream.embeddings.create(model=model, input=texts),
+            )
+        record_usage(lab, model, getattr(response, "usage", None))
+        return response
+
+    async def achat(self, model: str, messages, temperature: float = 0, **params):
+        """Async chat; runs on a worker thread so coalescing spans every event loop."""
+        return await asyncio.to_thread(self.chat, model, messages, temperature, **params)
+
+    async def astream(self, model: str, messages, temperature: float = 0, lab: str = "unknown",
+                      **params) -> AsyncIterator:
+        """Streams chat completion chunks. Streams are not coalesced."""
+        messages = to_openai_messages(messages)
+        await asyncio.sleep(self._reserve(model, _estimate_tokens(messages, params.get("max_tokens"))))
+        client = self._async_client()
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            try:
+                stream = await client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **params,
+                )
+                break
+            except Exception as e:
+                if attempt == self.max_retries or not _is_retryable(e):
+                    raise
+                delay = _backoff(attempt, e)
+                logger.warning("%s stream failed (%s); retry %s in %.2fs", model, type(e).__name__, attempt + 1, delay)
+                await asyncio.sleep(delay)
+        first_token_ms = None
+        with span("chat_stream", "llm", lab=lab, model=model) as attrs:
+            async for chunk in stream:
+                if first_token_ms is None:
+                    first_token_ms = (time.perf_counter() - start) * 1000
+                    attrs["ttft_ms"] = first_token_ms
+                if getattr(chunk, "usage", None):
+                    record_usage(lab, model, chunk.usage)
+                    attrs["cached_tokens"] = cached_tokens(chunk.usage)
+                yield chunk
+
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Returns the process-wide gateway."""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
@@ -1,9 +1,198 @@
-import logging, sys
+"""Non-blocking structured logging shared by the labs.
+
+Records are put on a bounded queue by one shared QueueHandler and written by a
+single background QueueListener thread, so request threads never contend on
+stdout; when the queue is full records are dropped and counted. Messages are
+formatted on the writer thread, so use %-style arguments
+(`logger.info("Answered in %.1f ms", ms)`) rather than f-strings.
+
+Every record carries the current request ID and pipeline stage (see
+`request_context`, set automatically by `common.telemetry.span`). Output is
+text by default, or one JSON object per line with LOG_FORMAT=json.
+
+Environment:
+    LOG_LEVEL       level for lab loggers (default INFO)
+    LOG_FORMAT      text | json
+    LOG_QUEUE_SIZE  records buffered before dropping (default 10000)
+    LOG_SAMPLING    per-logger sampling of DEBUG records, e.g.
+                    "common.telemetry=0.01,Research_Agent.corpora=0.1"
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+stage_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("stage", default=None)
+
+# Attributes every LogRecord has; anything else was passed via `extra=` and goes into the JSON.
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "stage"}
+
+
+def current_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None):
+    """Tags every record logged inside the block (and tasks/threads spawned from it) with a request ID."""
+    token = request_id_var.set(request_id or uuid.uuid4().hex[:16])
+    try:
+        yield request_id_var.get()
+    finally:
+        request_id_var.reset(token)
+
+
+@contextmanager
+def stage_context(stage: str):
+    token = stage_var.set(stage)
+    try:
+        yield
+    finally:
+        stage_var.reset(token)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "stage": getattr(record, "stage", None),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        tags = [f"{key}={getattr(record, key)}" for key in ("request_id", "duration_ms")
+                if getattr(record, key, None) is not None]
+        return f"{line} [{' '.join(tags)}]" if tags else line
+
+
+class _ContextQueueHandler(QueueHandler):
+    """Captures request context in the caller and defers formatting to the listener."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = request_id_var.get()
+        if getattr(record, "stage", None) is None:
+            record.stage = stage_var.get()
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # Block rather than fail at shutdown so queued records are still written
+        self.queue.put(self._sentinel)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of records at or below `level`; higher levels always pass."""
+
+    def __init__(self, rate: float, level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > self.level or random.random() < self.rate
+
+
+def _parse_sampling(value: str) -> Dict[str, float]:
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+
+SAMPLING = _parse_sampling(os.getenv("LOG_SAMPLING", ""))
+
+_handler: Optional[_ContextQueueHandler] = None
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+def _shared_handler() -> _ContextQueueHandler:
+    global _handler, _listener
+    if _handler is not None:
+        return _handler
+    with _setup_lock:
+        if _handler is None:
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(JSONFormatter() if LOG_FORMAT == "json" else TextFormatter())
+            log_queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+            _listener = _DrainingQueueListener(log_queue, stream)
+            _listener.start()
+            atexit.register(_listener.stop)
+            _handler = _ContextQueueHandler(log_queue)
+    return _handler
+
+
+def set_sampling(name: str, rate: float, level: int = logging.DEBUG) -> None:
+    """Samples `name`'s records at or below `level` down to `rate` (0..1); rate >= 1 removes sampling."""
+    logger = logging.getLogger(name)
+    for existing in [f for f in logger.filters if isinstance(f, SamplingFilter)]:
+        logger.removeFilter(existing)
+    if rate < 1:
+        logger.addFilter(SamplingFilter(rate, level))
+
+
 def get_logger(name: str) -> logging.Logger:
     logger = logging.getLogger(name)
     if not logger.handlers:
-        logger.setLevel(logging.INFO)
-        h = logging.StreamHandler(sys.stdout)
-        h.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-        logger.addHandler(h)
+        logger.setLevel(LOG_LEVEL)
+        logger.addHandler(_shared_handler())
+        logger.propagate = False
+        if name in SAMPLING:
+            set_sampling(name, SAMPLING[name])
     return logger
+
+
+def dropped_records() -> int:
+    return _handler.dropped if _handler is not None else 0
+
+
+def log_duration(logger: logging.Logger, stage: str, start: float, msg: str = "Stage finished", *args,
+                 level: int = logging.DEBUG) -> None:
+    """Logs a stage duration (from a perf_counter() start) as a structured `duration_ms` field."""
+    if logger.isEnabledFor(level):
+        duration_ms = round((time.perf_counter() - start) * 1000, 3)
+        logger.log(level, msg, *args, extra={"stage": stage, "duration_ms": duration_ms})
@@ -0,0 +1,234 @@
+"""Prometheus-style metrics for the labs (text exposition format, stdlib only).
+
+Served at /metrics by the Gurbani Flask app, and by a standalone exporter thread
+for the Streamlit process when METRICS_PORT is set (see `start_exporter`).
+"""
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# USD per 1M tokens: (prompt, completion).
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+}
+# USD per 1M prompt tokens served from the provider's prompt cache.
+CACHED_PROMPT_PRICES: Dict[str, float] = {
+    "gpt-4o-mini": 0.075,
+    "gpt-4.1-mini": 0.10,
+}
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, k)} {v}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [counts per bucket (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(k, (list(v[0]), v[1], v[2])) for k, v in self._values.items()]
+        lines = self.header()
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+STAGE_LATENCY = Histogram(
+    "lab_stage_latency_seconds",
+    "Latency of pipeline stages (embed, search, llm, parse, graph_node, request).",
+    ("lab", "stage", "model"),
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by API usage fields.", ("lab", "model", "kind"))
+LLM_COST = Counter("llm_cost_usd_total", "Estimated spend from API usage and MODEL_PRICES.", ("lab", "model"))
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result.", ("cache", "namespace", "result"))
+CACHE_HIT_RATIO = Gauge("cache_hit_ratio", "Hit ratio per cache namespace since process start.", ("cache", "namespace"))
+ERRORS = Counter("lab_errors_total", "Errors by lab and exception class.", ("lab", "exception"))
+GATE_DECISIONS = Counter(
+    "retrieval_gate_total", "Retrieval-confidence gate decisions (answered or refused).", ("lab", "corpus", "decision")
+)
+
+
+def observe_stage(stage: str, seconds: float, lab: str = "unknown", model: str = "") -> None:
+    STAGE_LATENCY.observe(seconds, lab=lab, stage=stage, model=model)
+
+
+def cached_tokens(usage) -> int:
+    """Prompt tokens the provider served from its prefix cache (usage.prompt_tokens_details.cached_tokens)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+
+
+def record_usage(lab: str, model: str, usage) -> None:
+    """Counts prompt/cached/completion tokens and cost from an OpenAI `usage` object."""
+    if usage is None:
+        return
+    prompt = getattr(usage, "prompt_tokens", 0) or 0
+    completion = getattr(usage, "completion_tokens", 0) or 0
+    cached = cached_tokens(usage)
+    LLM_TOKENS.inc(prompt, lab=lab, model=model, kind="prompt")
+    if cached:
+        LLM_TOKENS.inc(cached, lab=lab, model=model, kind="cached")
+    if completion:
+        LLM_TOKENS.inc(completion, lab=lab, model=model, kind="completion")
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    cached_price = CACHED_PROMPT_PRICES.get(model, prompt_price)
+    cost = (prompt - cached) * prompt_price + cached * cached_price + completion * completion_price
+    LLM_COST.inc(cost / 1_000_000, lab=lab, model=model)
+
+
+def record_cache(cache: str, namespace: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, namespace=namespace, result="hit" if hit else "miss")
+    hits = CACHE_REQUESTS.value(cache=cache, namespace=namespace, result="hit")
+    misses = CACHE_REQUESTS.value(cache=cache, namespace=namespace, result="miss")
+    CACHE_HIT_RATIO.set(hits / max(1.0, hits + misses), cache=cache, namespace=namespace)
+
+
+def record_gate(lab: str, corpus: str, answered: bool) -> None:
+    GATE_DECISIONS.inc(lab=lab, corpus=corpus, decision="answered" if answered else "refused")
+
+
+def record_error(lab: str, exc: BaseException) -> None:
+    ERRORS.inc(lab=lab, exception=type(exc).__name__)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_exporter: Optional[ThreadingHTTPServer] = None
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(port: Optional[int] = None, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Starts the standalone /metrics server once per process.
+
+    Without an explicit port this is a no-op unless METRICS_PORT is set, so the
+    labs can call it unconditionally from their Streamlit entry points.
+    """
+    global _exporter
+    port = port or int(os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    with _exporter_lock:
+        if _exporter is None:
+            try:
+                _exporter = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                logger.error("Metrics exporter could not bind to port %s: %s", port, e)
+                return None
+            _exporter.daemon_threads = True
+            threading.Thread(target=_exporter.serve_forever, name="metrics-exporter", daemon=True).start()
+            logger.info("Metrics exporter listening on http://%s:%s/metrics", host, port)
+        return _exporter
@@ -0,0 +1,29 @@
+"""Chat prompt layout shared by the labs, ordered for provider-side prefix caching.
+
+Providers reuse the work done on a prompt prefix that matches a recent request
+exactly (OpenAI: from 1024 tokens, in 128-token steps), which cuts
+time-to-first-token and bills those tokens at the cached rate. Messages are
+therefore laid out from most to least reusable:
+
+    system  static instructions, identical for every call of a lab
+    user    long context (a document, or retrieved chunks in a stable order)
+            the question, last
+
+Anything that varies per request placed before the context breaks the shared prefix.
+"""
+from typing import Any, Iterable, List, Tuple
+
+
+def context_blocks(blocks: Iterable[Tuple[Any, str]], show_keys: bool = True) -> str:
+    """Joins (key, text) blocks sorted by key, so the same set of chunks renders identically in any retrieval order."""
+    ordered = sorted(blocks, key=lambda block: block[0])
+    return "\n\n".join(f"[{key}] {text.strip()}" if show_keys else text.strip() for key, text in ordered)
+
+
+def build_messages(instructions: str, context: str, question: str, context_label: str = "Context",
+                   question_label: str = "Question") -> List[dict]:
+    """System instructions, then the context, then the question."""
+    return [
+        {"role": "system", "content": instructions},
+        {"role": "user", "content": f"{context_label}:\n{context}\n\n{question_label}: {question}"},
+    ]
@@ -0,0 +1,45 @@
+"""Diversity re-ranking of retrieved candidates (maximal marginal relevance).
+
+Retrieval over-fetches `fetch_k` candidates and keeps their vectors; MMR then
+picks k of them, trading relevance to the query against similarity to what is
+already selected, so overlapping chunks and repeated transcript passages do not
+fill the prompt with near-duplicates.
+
+    score(c) = lambda_mult * sim(q, c) - (1 - lambda_mult) * max_{s in selected} sim(c, s)
+
+lambda_mult = 1 is plain similarity ranking; lower values favour diversity.
+"""
+import os
+
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.5"))
+# Candidates fetched per requested result when re-ranking.
+FETCH_FACTOR = int(os.getenv("MMR_FETCH_FACTOR", "4"))
+
+
+def mmr_select(query, candidates, k: int, lambda_mult: float = MMR_LAMBDA, relevance=None):
+    """Greedy MMR over L2-normalised candidate vectors; returns candidate positions in selection order.
+
+    Candidate-to-candidate similarities are one matrix product up front; each of
+    the k selection steps is then a handful of vector operations over the
+    candidates (no per-pair Python work). `relevance` defaults to candidates @ query.
+    """
+    import numpy as np
+
+    n = len(candidates)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    relevance = candidates @ query if relevance is None else np.asarray(relevance, dtype=np.float32)
+    pairwise = candidates @ candidates.T
+
+    selected = np.empty(k, dtype=np.int64)
+    selected[0] = int(np.argmax(relevance))
+    max_sim = pairwise[selected[0]].copy()
+    weighted = lambda_mult * relevance
+    for i in range(1, k):
+        scores = weighted - (1 - lambda_mult) * max_sim
+        scores[selected[:i]] = -np.inf
+        best = int(np.argmax(scores))
+        selected[i] = best
+        np.maximum(max_sim, pairwise[best], out=max_sim)
+    return selected
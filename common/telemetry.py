@@ -0,0 +1,235 @@
+"""Non-blocking span/event recorder.
+
+Spans and events are pushed onto a bounded in-memory queue and exported in
+batches by one background thread. When the queue is full records are dropped
+(and counted) instead of blocking the caller, so instrumenting a hot path costs
+a perf_counter() pair, a histogram update (common.metrics) and a put_nowait().
+
+Exporters are pluggable: anything with `export(batch: list[dict])` works. The
+default is chosen by TELEMETRY_EXPORTER = jsonl (default) | sqlite | langsmith | none.
+"""
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import List, Optional
+
+from common.logger import current_request_id, get_logger, log_duration, request_context, stage_context
+from common.metrics import observe_stage
+
+logger = get_logger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+TELEMETRY_DIR = Path(os.getenv("TELEMETRY_DIR", ROOT_DIR / ".cache" / "telemetry"))
+QUEUE_SIZE = int(os.getenv("TELEMETRY_QUEUE_SIZE", "10000"))
+BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "500"))
+FLUSH_INTERVAL = float(os.getenv("TELEMETRY_FLUSH_INTERVAL", "2.0"))
+
+STAGES = ("embed", "search", "llm", "parse", "graph_node", "request", "event")
+
+
+class JSONLExporter:
+    def __init__(self, path: Path = TELEMETRY_DIR / "spans.jsonl"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, batch: List[dict]) -> None:
+        with self.path.open("a", encoding="utf-8") as fh:
+            fh.writelines(json.dumps(record, ensure_ascii=False, default=str) + "\n" for record in batch)
+
+
+class SQLiteExporter:
+    def __init__(self, path: Path = TELEMETRY_DIR / "spans.sqlite3"):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Only ever used from the exporter thread.
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS spans ("
+            " ts REAL, name TEXT, stage TEXT, duration_ms REAL, error TEXT, attrs TEXT)"
+        )
+
+    def export(self, batch: List[dict]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO spans VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (r["ts"], r["name"], r["stage"], r.get("duration_ms"), r.get("error"),
+                     json.dumps({**r.get("attrs", {}), "request_id": r.get("request_id")},
+                                ensure_ascii=False, default=str))
+                    for r in batch
+                ],
+            )
+
+
+class LangSmithExporter:
+    """Forwards records as LangSmith events using one long-lived client."""
+
+    def __init__(self):
+        from common.tracing import get_langsmith_client
+
+        self.client = get_langsmith_client()
+
+    def export(self, batch: List[dict]) -> None:
+        for record in batch:
+            self.client.create_event(name=record["name"], metadata=record)
+
+
+class NullExporter:
+    def export(self, batch: List[dict]) -> None:
+        pass
+
+
+def default_exporter():
+    kind = os.getenv("TELEMETRY_EXPORTER", "jsonl").lower()
+    if kind == "sqlite":
+        return SQLiteExporter()
+    if kind == "langsmith":
+        return LangSmithExporter()
+    if kind == "none":
+        return NullExporter()
+    return JSONLExporter()
+
+
+class Recorder:
+    def __init__(self, exporter=None, queue_size: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE,
+                 flush_interval: float = FLUSH_INTERVAL):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.exported = 0
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="telemetry-exporter", daemon=True)
+                self._thread.start()
+
+    def record(self, record: dict) -> None:
+        """Enqueues a record; drops it if the queue is full. Never blocks."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        if self.exporter is None:
+            try:
+                self.exporter = default_exporter()
+            except Exception as e:
+                logger.error("Telemetry exporter unavailable, dropping records: %s", e)
+                self.exporter = NullExporter()
+        stopping = False
+        while not stopping:
+            batch: List[dict] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                try:
+                    self.exporter.export(batch)
+                    self.exported += len(batch)
+                except Exception as e:
+                    self.dropped += len(batch)
+                    logger.error("Telemetry export of %s records failed: %s", len(batch), e)
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Stops the exporter thread after draining what is already queued."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "exported": self.exported, "dropped": self.dropped}
+
+
+_recorder = Recorder()
+atexit.register(_recorder.flush)
+
+
+def get_recorder() -> Recorder:
+    return _recorder
+
+
+@contextmanager
+def _request_scope(stage: str):
+    # A "request" span opens a request context unless one is already active
+    if stage == "request" and current_request_id() is None:
+        with request_context():
+            yield
+    else:
+        yield
+
+
+@contextmanager
+def span(name: str, stage: str, **attrs):
+    """Times a block and records it as a span. Exceptions are recorded and re-raised.
+
+    Log records inside the block carry the stage, and the request ID of the
+    enclosing "request" span.
+    """
+    start = time.perf_counter()
+    error = None
+    with _request_scope(stage), stage_context(stage):
+        try:
+            yield attrs
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            observe_stage(stage, elapsed, lab=attrs.get("lab", "unknown"), model=attrs.get("model", ""))
+            log_duration(logger, stage, start, "Span %s finished", name)
+            _recorder.record({
+                "ts": time.time(),
+                "name": name,
+                "stage": stage,
+                "duration_ms": elapsed * 1000,
+                "request_id": current_request_id(),
+                "error": error,
+                "attrs": attrs,
+            })
+
+
+def traced(name: str, stage: str, **attrs):
+    """Decorator form of `span`."""
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name, stage, **attrs):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def event(name: str, **attrs) -> None:
+    """Records a point-in-time event."""
+    _recorder.record({"ts": time.time(), "name": name, "stage": "event", "request_id": current_request_id(),
+                      "error": None, "attrs": attrs})
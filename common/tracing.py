@@ -1,13 +1,16 @@
 import os
-from langsmith import Client
 
-def get_langsmith_client() -> Client:
+from common.telemetry import event
+
+def get_langsmith_client():
     """
     Returns a LangSmith client if environment variables are set.
     Requires:
       - LANGSMITH_API_KEY
       - (Optional) LANGSMITH_ENDPOINT
     """
+    from langsmith import Client
+
     api_key = os.getenv("LANGSMITH_API_KEY")
     endpoint = os.getenv("LANGSMITH_ENDPOINT")  # defaults to https://api.smith.langchain.com
 
@@ -19,10 +22,8 @@ def get_langsmith_client() -> Client:
 
 def trace_event(event_name: str, metadata: dict = None):
     """
-    Records a custom trace event in LangSmith.
+    Records a custom trace event. The event is queued and exported in the
+    background by common.telemetry (set TELEMETRY_EXPORTER=langsmith to send
+    it to LangSmith); this call never blocks on the network.
     """
-    client = get_langsmith_client()
-    client.create_event(
-        name=event_name,
-        metadata=metadata or {},
-    )
\ No newline at end of file
+    event(event_name, metadata=metadata or {})
@@ -0,0 +1,23 @@
+"""LangChain retriever over `common.vector_store.VectorStore` (see `VectorStore.as_retriever`)."""
+from typing import Any, Callable, List, Optional, Sequence
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+class VectorStoreRetriever(BaseRetriever):
+    store: Any
+    embed_query: Callable[[str], Sequence[float]]
+    k: int = 4
+    where: Optional[dict] = None
+    text_column: str = "text"
+    fetch_k: Optional[int] = None
+    lambda_mult: Optional[float] = None
+    # Confidence gate: no documents unless the best score reaches it (see common.gating)
+    min_score: Optional[float] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        rows = self.store.query(self.embed_query(query), k=self.k, where=self.where, fetch_k=self.fetch_k,
+                                lambda_mult=self.lambda_mult, min_score=self.min_score)
+        return [Document(page_content=row.pop(self.text_column, "") or "", metadata=row) for row in rows]
@@ -0,0 +1,457 @@
+"""Vector store shared by the RAG labs.
+
+One engine for every lab, so indexing and search optimisations land everywhere:
+
+- batched `add` / `search` over float32 matrices (inner product; vectors are
+  L2-normalised by default, i.e. cosine similarity);
+- columnar metadata (`{"text": [...], "video_id": [...]}`) with equality /
+  membership filters applied before ranking (`where={"video_id": "abc"}`);
+- persistence as a directory (`manifest.json`, `vectors.npy`, `metadata.json`,
+  plus `index.faiss` for ANN index types); vectors are memory-mapped on load;
+- crash-safe rebuilds: a new version is saved into a generation subdirectory
+  and `publish` atomically swaps the top-level manifest to point at it, so a
+  reader always loads one complete generation;
+- index types: "flat" (exact, BLAS matmul over the vector matrix), "hnsw" and
+  "ivf" (faiss), or "auto" to pick by corpus size;
+- `search_mmr` over-fetches and re-ranks for diversity (see common.rerank);
+- concurrent searches share a read lock; adds take the write lock;
+- `as_retriever()` adapts the store to a LangChain retriever.
+
+numpy and faiss are imported on first use.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import math
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from common.exceptions import VectorStoreError
+from common.logger import get_logger
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = get_logger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+# "auto" uses exact search up to this many vectors and HNSW beyond it.
+AUTO_FLAT_MAX = int(os.getenv("VECTOR_STORE_AUTO_FLAT_MAX", "50000"))
+HNSW_M = 32
+MANIFEST = "manifest.json"
+VECTORS = "vectors.npy"
+METADATA = "metadata.json"
+FAISS_INDEX = "index.faiss"
+GENERATION_PREFIX = "gen-"
+# Published generations kept on disk: the current one, plus the previous for readers still loading it
+KEEP_GENERATIONS = 2
+
+Where = Dict[str, object]
+
+
+def select_index_type(count: int) -> str:
+    return "flat" if count <= AUTO_FLAT_MAX else "hnsw"
+
+
+def _normalize(matrix: "np.ndarray") -> "np.ndarray":
+    import numpy as np
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class _ReadWriteLock:
+    """Many concurrent readers or one writer."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class VectorStore:
+    def __init__(self, dim: int, index_type: str = "auto", normalize: bool = True):
+        if index_type != "auto" and index_type not in INDEX_TYPES:
+            raise VectorStoreError(f"Unknown index type {index_type!r}; expected auto or one of {INDEX_TYPES}.")
+        self.dim = dim
+        self.requested_index_type = index_type
+        self.normalize = normalize
+        self.columns: Dict[str, list] = {}
+        self._vectors: Optional["np.ndarray"] = None
+        self._index = None  # faiss index for hnsw/ivf
+        self._index_type: Optional[str] = None
+        self._index_readonly = False
+        self._column_arrays: Dict[str, "np.ndarray"] = {}
+        self._lock = _ReadWriteLock()
+        self.path: Optional[Path] = None  # directory it was saved to / loaded from
+        self.generation: Optional[str] = None  # published generation the files were loaded from, if any
+        self.embedding: Optional[dict] = None  # provider/model that produced the vectors (common.embeddings)
+
+    # ---------------- writes ----------------
+    def __len__(self) -> int:
+        return 0 if self._vectors is None else int(self._vectors.shape[0])
+
+    @property
+    def index_type(self) -> str:
+        if self.requested_index_type != "auto":
+            return self.requested_index_type
+        return select_index_type(len(self))
+
+    def memory_bytes(self) -> int:
+        """Estimated resident size: vector matrix, ANN index copy and metadata text."""
+        size = self.vectors.nbytes
+        if self._index is not None:
+            size += self._index.ntotal * self.dim * 4
+        for values in self.columns.values():
+            size += sum(len(v) if isinstance(v, str) else 8 for v in values)
+        return size
+
+    @property
+    def vectors(self) -> "np.ndarray":
+        import numpy as np
+
+        return self._vectors if self._vectors is not None else np.empty((0, self.dim), dtype="float32")
+
+    def add(self, vectors, columns: Optional[Dict[str, Sequence]] = None) -> "np.ndarray":
+        """Adds a batch of vectors with columnar metadata; returns their row ids."""
+        import numpy as np
+
+        matrix = np.asarray(vectors, dtype="float32")
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if matrix.shape[1] != self.dim:
+            raise VectorStoreError(f"Expected {self.dim}-dimensional vectors, got {matrix.shape[1]}.")
+        columns = columns or {}
+        for name, values in columns.items():
+            if len(values) != len(matrix):
+                raise VectorStoreError(f"Column {name!r} has {len(values)} values for {len(matrix)} vectors.")
+        if self.normalize:
+            matrix = _normalize(matrix)
+
+        with self._lock.write():
+            start = len(self)
+            self._vectors = matrix if self._vectors is None else np.concatenate([self._vectors, matrix])
+            for name in set(self.columns) | set(columns):
+                existing = self.columns.setdefault(name, [None] * start)
+                existing.extend(columns.get(name, [None] * len(matrix)))
+            self._column_arrays.clear()
+            self._sync_index()
+            return np.arange(start, start + len(matrix))
+
+    def _sync_index(self) -> None:
+        """Brings the faiss index (hnsw/ivf) up to date with the vector matrix. Caller holds the write lock."""
+        index_type = self.index_type
+        if index_type != self._index_type or self._index_readonly:
+            # Type changed (auto crossed AUTO_FLAT_MAX) or the index is a read-only mmap: rebuild
+            self._index = None
+            self._index_type = index_type
+            self._index_readonly = False
+        if index_type == "flat" or not len(self):
+            return
+        import faiss
+        import numpy as np
+
+        if self._index is None:
+            if index_type == "hnsw":
+                self._index = faiss.IndexHNSWFlat(self.dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            else:
+                # ~sqrt(n) lists, keeping faiss's recommended >= 39 training points per list
+                nlist = max(1, min(int(math.sqrt(len(self))), len(self) // 39))
+                quantizer = faiss.IndexFlatIP(self.dim)
+                self._index = faiss.IndexIVFFlat(quantizer, self.dim, nlist, faiss.METRIC_INNER_PRODUCT)
+                self._index.train(np.ascontiguousarray(self._vectors))
+                self._index.nprobe = max(1, nlist // 8)
+        pending = self._vectors[self._index.ntotal:]
+        if len(pending):
+            self._index.add(np.ascontiguousarray(pending))
+
+    # ---------------- reads ----------------
+    def _column_array(self, name: str) -> "np.ndarray":
+        import numpy as np
+
+        array = self._column_arrays.get(name)
+        if array is None:
+            if name not in self.columns:
+                raise VectorStoreError(f"Unknown metadata column {name!r}.")
+            array = np.empty(len(self), dtype=object)
+            array[:] = self.columns[name]
+            self._column_arrays[name] = array
+        return array
+
+    def mask(self, where: Where) -> "np.ndarray":
+        """Boolean row mask for `where`: {column: value} or {column: [allowed values]}."""
+        import numpy as np
+
+        mask = np.ones(len(self), dtype=bool)
+        for name, expected in where.items():
+            values = self._column_array(name)
+            if isinstance(expected, (list, tuple, set, frozenset)):
+                mask &= np.isin(values, list(expected))
+            else:
+                mask &= values == expected
+        return mask
+
+    def search(self, queries, k: int = 5, where: Optional[Where] = None) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Batched top-k search. Returns (scores, ids), each (n_queries, k); missing slots are -1."""
+        import numpy as np
+
+        matrix = np.asarray(queries, dtype="float32")
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        if matrix.shape[1] != self.dim:
+            raise VectorStoreError(f"Expected {self.dim}-dimensional queries, got {matrix.shape[1]}.")
+        if self.normalize:
+            matrix = _normalize(matrix)
+
+        with self._lock.read():
+            candidates = None if where is None else np.flatnonzero(self.mask(where))
+            if candidates is not None or self._index is None:
+                # Exact search over the whole matrix, or over the filtered rows only
+                subset = self.vectors if candidates is None else self.vectors[candidates]
+                scores, ids = _exact_topk(subset, matrix, k)
+                if candidates is not None:
+                    ids = np.where(ids >= 0, candidates[np.maximum(ids, 0)], -1)
+                return scores, ids
+            scores, ids = self._index.search(np.ascontiguousarray(matrix), min(k, len(self)))
+        if ids.shape[1] < k:
+            pad = k - ids.shape[1]
+            scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+            ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+        return scores, ids
+
+    def search_mmr(self, query, k: int = 5, fetch_k: Optional[int] = None, lambda_mult: Optional[float] = None,
+                   where: Optional[Where] = None) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Single-query search that fetches `fetch_k` candidates and keeps k of them by MMR.
+
+        Returns (scores, ids) shaped (1, k) like `search`; scores are the original query similarities.
+        """
+        import numpy as np
+        from common.rerank import FETCH_FACTOR, MMR_LAMBDA, mmr_select
+
+        fetch_k = max(k, fetch_k or k * FETCH_FACTOR)
+        scores, ids = self.search(query, k=fetch_k, where=where)
+        valid = ids[0] >= 0
+        candidate_ids, candidate_scores = ids[0][valid], scores[0][valid]
+        with self._lock.read():
+            candidates = np.asarray(self.vectors[candidate_ids], dtype="float32")
+        query = np.asarray(query, dtype="float32").reshape(-1)
+        order = mmr_select(_normalize(query.reshape(1, -1))[0] if self.normalize else query, candidates, k,
+                           MMR_LAMBDA if lambda_mult is None else lambda_mult, relevance=candidate_scores)
+        out_scores = np.full((1, k), -np.inf, dtype="float32")
+        out_ids = np.full((1, k), -1, dtype="int64")
+        out_scores[0, :len(order)] = candidate_scores[order]
+        out_ids[0, :len(order)] = candidate_ids[order]
+        return out_scores, out_ids
+
+    def rows(self, ids: Sequence[int]) -> List[dict]:
+        return [{name: values[i] for name, values in self.columns.items()} for i in ids if i >= 0]
+
+    def query(self, vector, k: int = 5, where: Optional[Where] = None, fetch_k: Optional[int] = None,
+              lambda_mult: Optional[float] = None, min_score: Optional[float] = None) -> List[dict]:
+        """Single-query convenience: metadata rows of the top-k hits, each with a "score".
+
+        Passing fetch_k (> k) re-ranks the over-fetched candidates with MMR. With
+        min_score, no rows are returned unless the best hit reaches it (see common.gating).
+        """
+        if fetch_k and fetch_k > k:
+            scores, ids = self.search_mmr(vector, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, where=where)
+        else:
+            scores, ids = self.search(vector, k=k, where=where)
+        if min_score is not None and not (scores[0] >= min_score).any():
+            return []
+        results = []
+        for score, row_id in zip(scores[0], ids[0]):
+            if row_id < 0:
+                continue
+            row = {name: values[row_id] for name, values in self.columns.items()}
+            row["score"] = float(score)
+            results.append(row)
+        return results
+
+    # ---------------- persistence ----------------
+    def save(self, path: Union[str, Path]) -> None:
+        import numpy as np
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock.read():
+            np.save(path / VECTORS, self.vectors)
+            (path / METADATA).write_text(json.dumps({"columns": self.columns}, ensure_ascii=False), encoding="utf-8")
+            if self._index is not None:
+                import faiss
+
+                faiss.write_index(self._index, str(path / FAISS_INDEX))
+            manifest = {
+                "dim": self.dim,
+                "count": len(self),
+                "index_type": self.index_type,
+                "requested_index_type": self.requested_index_type,
+                "normalize": self.normalize,
+                "embedding": self.embedding,
+            }
+            (path / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        self.path = path
+
+    @classmethod
+    def load(cls, path: Union[str, Path], mmap: bool = True) -> "VectorStore":
+        """Loads a saved store; with mmap=True vectors (and ANN index) are paged in on demand."""
+        import numpy as np
+
+        path = Path(path)
+        files, manifest = _resolve(path)
+        store = cls(manifest["dim"], manifest.get("requested_index_type", "auto"), manifest.get("normalize", True))
+        store._vectors = np.load(files / VECTORS, mmap_mode="r" if mmap else None)
+        store.columns = json.loads((files / METADATA).read_text(encoding="utf-8"))["columns"]
+        store._index_type = manifest["index_type"]
+        store.path = path
+        store.generation = manifest.get("generation")
+        store.embedding = manifest.get("embedding")
+        if (files / FAISS_INDEX).exists():
+            import faiss
+
+            flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+            try:
+                store._index = faiss.read_index(str(files / FAISS_INDEX), flags)
+                store._index_readonly = bool(flags)
+            except RuntimeError:
+                # Not every index type supports mmap
+                store._index = faiss.read_index(str(files / FAISS_INDEX))
+        logger.info("Loaded vector store %s: %s vectors, index=%s, generation=%s", path, len(store),
+                    store.index_type, store.generation)
+        return store
+
+    @property
+    def data_path(self) -> Optional[Path]:
+        """Directory holding this store's files (the published generation, if any)."""
+        if self.path is None:
+            return None
+        return self.path / self.generation if self.generation else self.path
+
+    def as_retriever(self, embed_query: Callable[[str], Sequence[float]], k: int = 4,
+                     where: Optional[Where] = None, text_column: str = "text", fetch_k: Optional[int] = None,
+                     lambda_mult: Optional[float] = None, min_score: Optional[float] = None):
+        from common.vector_retriever import VectorStoreRetriever
+
+        return VectorStoreRetriever(store=self, embed_query=embed_query, k=k, where=where, text_column=text_column,
+                                    fetch_k=fetch_k, lambda_mult=lambda_mult, min_score=min_score)
+
+
+def read_columns(path: Union[str, Path]) -> Dict[str, list]:
+    """Metadata columns of a saved store, without loading its vectors."""
+    files, _ = _resolve(Path(path))
+    return json.loads((files / METADATA).read_text(encoding="utf-8"))["columns"]
+
+
+def _resolve(path: Path) -> Tuple[Path, dict]:
+    """(directory holding the files, manifest) of a store, following a published generation.
+
+    The top-level manifest is read once, so a concurrent `publish` cannot mix two generations.
+    """
+    if not (path / MANIFEST).exists():
+        raise VectorStoreError(f"No vector store found at {path}.")
+    manifest = json.loads((path / MANIFEST).read_text(encoding="utf-8"))
+    generation = manifest.get("generation")
+    return (path / generation if generation else path), manifest
+
+
+def stored_index_type(path: Union[str, Path]) -> Optional[str]:
+    """Index type of the store saved at `path` (following its published generation), or None if there is none."""
+    try:
+        return _resolve(Path(path))[1].get("index_type")
+    except VectorStoreError:
+        return None
+
+
+def new_generation() -> str:
+    """Name for a generation subdirectory; names sort by creation time."""
+    return f"{GENERATION_PREFIX}{datetime.datetime.now().strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+
+def publish(path: Union[str, Path], generation: str) -> None:
+    """Makes `path/generation` (a saved store) the live version of the store at `path`.
+
+    The top-level manifest is replaced with an atomic rename, so readers see
+    either the old or the new generation. Older generations beyond
+    KEEP_GENERATIONS, and files of an unversioned store, are removed afterwards.
+    """
+    path = Path(path)
+    manifest = json.loads((path / generation / MANIFEST).read_text(encoding="utf-8"))
+    manifest["generation"] = generation
+    tmp = path / f".{MANIFEST}.{uuid.uuid4().hex[:8]}.tmp"
+    with tmp.open("w", encoding="utf-8") as fh:
+        fh.write(json.dumps(manifest, indent=2))
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path / MANIFEST)
+    _fsync_dir(path)
+    logger.info("Published %s generation %s (%s vectors)", path, generation, manifest["count"])
+
+    generations = sorted(p.name for p in path.glob(f"{GENERATION_PREFIX}*") if p.is_dir())
+    stale = [name for name in generations if name != generation][:-(KEEP_GENERATIONS - 1) or None]
+    for name in stale:
+        shutil.rmtree(path / name, ignore_errors=True)
+    for name in (VECTORS, METADATA, FAISS_INDEX):
+        (path / name).unlink(missing_ok=True)
+
+
+def _fsync_dir(path: Path) -> None:
+    """Persists a rename in `path` (no-op where directories cannot be opened, e.g. Windows)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _exact_topk(vectors: "np.ndarray", queries: "np.ndarray", k: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    import numpy as np
+
+    n = vectors.shape[0]
+    scores = np.full((len(queries), k), -np.inf, dtype="float32")
+    ids = np.full((len(queries), k), -1, dtype="int64")
+    if n == 0:
+        return scores, ids
+    sims = queries @ vectors.T  # (n_queries, n)
+    take = min(k, n)
+    top = np.argpartition(-sims, take - 1, axis=1)[:, :take] if take < n else np.tile(np.arange(n), (len(queries), 1))
+    top_scores = np.take_along_axis(sims, top, axis=1)
+    order = np.argsort(-top_scores, axis=1)
+    ids[:, :take] = np.take_along_axis(top, order, axis=1)
+    scores[:, :take] = np.take_along_axis(top_scores, order, axis=1)
+    return scores, ids
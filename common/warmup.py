@@ -0,0 +1,81 @@
+"""Optional background warm-up of the lazily loaded lab stacks.
+
+The lab pages only import Streamlit and the light `common` modules at load
+time; LangChain, LangGraph, numpy and the OpenAI SDK are imported on first use
+(faiss too, and only for stores built with an hnsw/ivf index).
+Set LAB_WARMUP=all (or a comma-separated list such as "gurbani,netzero") to
+import them in a daemon thread while the page renders, so the first click
+does not pay the import cost either.
+"""
+import importlib
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+# "module" imports the module; "module:attr" also calls attr() once imported.
+WARMUP_TARGETS: Dict[str, tuple] = {
+    "gurbani": ("numpy", "openai", "common.vector_store", "common.embeddings", "Gurbani_OCR_RAG.ask",
+                "Gurbani_OCR_RAG.ask:warm_index_backend"),
+    "youtube": ("numpy", "openai", "youtube_transcript_api", "langchain_text_splitters", "common.vector_store",
+                "common.embeddings", "YouTube_RAG.pipeline"),
+    "legal": ("pdfplumber", "Legal_Doc_Analyzer.pipeline"),
+    "netzero": ("openai", "NetZero_Advisor.graph:get_graph"),
+    "research": ("openai", "Research_Agent.orchestrator"),
+}
+
+_started: set = set()
+_lock = threading.Lock()
+
+
+def enabled_labs() -> set:
+    value = os.getenv("LAB_WARMUP", "").strip().lower()
+    if value in {"", "0", "false", "no"}:
+        return set()
+    if value in {"1", "all", "true", "yes"}:
+        return set(WARMUP_TARGETS)
+    return {lab.strip() for lab in value.split(",") if lab.strip()}
+
+
+def warm_up(labs: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """Imports (and optionally initialises) each lab's heavy stack; returns seconds per target."""
+    timings: Dict[str, float] = {}
+    for lab in labs or WARMUP_TARGETS:
+        for target in WARMUP_TARGETS.get(lab, ()):
+            if target in timings:
+                continue
+            module_name, _, attr = target.partition(":")
+            start = time.perf_counter()
+            try:
+                module = importlib.import_module(module_name)
+                if attr:
+                    getattr(module, attr)()
+            except Exception as e:
+                logger.warning("Warm-up of %s failed: %s", target, e)
+                continue
+            timings[target] = time.perf_counter() - start
+    return timings
+
+
+def start_warm_up(*labs: str) -> Optional[threading.Thread]:
+    """Warms the given labs (default: all) in the background if LAB_WARMUP enables them.
+
+    Each lab is warmed at most once per process; safe to call on every rerun.
+    """
+    with _lock:
+        pending = [lab for lab in (labs or WARMUP_TARGETS) if lab in enabled_labs() and lab not in _started]
+        if not pending:
+            return None
+        _started.update(pending)
+
+    def _run():
+        timings = warm_up(pending)
+        logger.info("Warm-up of %s finished in %.2fs", ', '.join(pending), sum(timings.values()))
+
+    thread = threading.Thread(target=_run, name="lab-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from common.exceptions import ResearchError
+from Research_Agent.admission import AdmissionController
+
+
+async def _arrivals(controller: AdmissionController, count: int, hold: float = 0.05) -> list:
+    async def request():
+        try:
+            async with controller.admit():
+                await asyncio.sleep(hold)
+            return "ok"
+        except ResearchError:
+            return "rejected"
+
+    return await asyncio.gather(*(request() for _ in range(count)))
+
+
+@pytest.mark.parametrize("concurrency, queue", [(2, 2), (1, 1), (4, 0)])
+def test_concurrency_plus_queue_is_admitted(concurrency, queue):
+    controller = AdmissionController(max_concurrency=concurrency, max_queue=queue, queue_timeout=5)
+    results = asyncio.run(_arrivals(controller, concurrency + queue))
+    assert results == ["ok"] * (concurrency + queue)
+    assert controller.metrics()["rejected"] == 0
+
+
+def test_beyond_queue_is_rejected():
+    controller = AdmissionController(max_concurrency=2, max_queue=2, queue_timeout=5)
+    results = asyncio.run(_arrivals(controller, 5))
+    assert results.count("ok") == 4 and results.count("rejected") == 1
+    assert controller.metrics()["queue_depth"] == 0